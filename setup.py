@@ -1,9 +1,19 @@
+from setuptools import find_packages
 from setuptools import setup
 
+# The tools are installed under the to_clippd package, whose __init__ lets them import each other by their names.
+TOOLS = find_packages("to_clippd", exclude=["test", "test.*"])
+
 setup(name="to_clippd",
       version="0.1",
       description="Take files from external sources and map them into one clippd dataframe",
       url="https://github.com/Mastrodicasa/tech_test",
       author="Simon Mastrodicasa",
-      author_email="simon.mastrodicasa@hotmail.com"
+      author_email="simon.mastrodicasa@hotmail.com",
+      package_dir={"to_clippd": "to_clippd"},
+      packages=["to_clippd"] + ["to_clippd." + tool for tool in TOOLS],
+      package_data={"to_clippd.derive_insights": ["*.csv"], "to_clippd.map_to_clippd": ["*.xlsx"]},
+      install_requires=["geopy", "numpy", "openpyxl", "pandas", "pytz", "scipy"],
+      extras_require={"plot": ["seaborn"], "parquet": ["pyarrow"]},
+      entry_points={"console_scripts": ["to_clippd=to_clippd.cli.cli:main"]}
       )
@@ -0,0 +1,7 @@
+def __getattr__(name):
+    """Gives ToClippd as the to_clippd module does, imported when first used to keep this import fast."""
+    if name == "ToClippd":
+        from to_clippd.to_clippd import ToClippd
+
+        return ToClippd
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
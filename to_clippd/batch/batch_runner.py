@@ -0,0 +1,194 @@
+import json
+import os
+import socket
+import threading
+import time
+import zlib
+
+import pandas as pd
+
+from to_clippd.batch.work_queue import WorkQueue
+
+
+def shard_of(user_id, n_shards):
+    """Returns the shard of a player. crc32 is used as Python's hash of strings changes between processes."""
+    return zlib.crc32(str(user_id).encode("utf-8")) % n_shards
+
+
+def read_rounds(rounds_file):
+    """Returns the list of rounds of a rounds file (a single round is put in a list), None if it can't be read."""
+    try:
+        with open(rounds_file) as f:
+            document = json.load(f)
+        rounds = document if isinstance(document, list) else [document]
+    except Exception:
+        return None
+    # A round without userId can't be given to a shard, like an unreadable file.
+    if not all(isinstance(round_data, dict) and "userId" in round_data for round_data in rounds):
+        return None
+    return rounds
+
+
+class BatchRunner(object):
+    """
+    Runs ToClippd on many rounds, split by player into shards that workers on several machines share.
+
+    The rounds are given to shards by a hash of their userId, so all the rounds of a player go to the same shard. The
+    files of a shard are still processed one chunk at a time. A file with a list of rounds of players of different
+    shards is split into one file per shard, in the rounds directory of the shared directory. The shards are handed
+    out through a WorkQueue in the shared directory, each shard result is written to its own file there, and merge
+    puts them together once all the shards are done.
+
+    Attributes:
+        directory: Directory shared by the workers, with the queue and the results
+        source: Name of the external source
+        n_shards: Number of shards
+        work_queue: WorkQueue of the shards
+        heartbeat_interval: Seconds between two heartbeats of a worker
+        poll_interval: Seconds a worker waits before looking again for a shard, when the others are all claimed
+    """
+
+    def __init__(self, directory, source="arccos", n_shards=16, timeout=300, heartbeat_interval=None,
+                 poll_interval=None):
+        self.directory = directory
+        self.source = source
+        self.n_shards = n_shards
+        os.makedirs(os.path.join(directory, "results"), exist_ok=True)
+        self.work_queue = WorkQueue(os.path.join(directory, "queue.sqlite"), timeout=timeout)
+        self.heartbeat_interval = heartbeat_interval or timeout / 5
+        self.poll_interval = poll_interval or timeout / 5
+
+    def partition(self, files):
+        """
+        Splits the chunks of files into shards of players.
+
+        Args:
+            files: Iterable of (rounds_file, terrain_file, course_file)
+        Returns:
+            (dict) shard -> list of (rounds_file, terrain_file, course_file), without empty shards
+        """
+        shards = {}
+        for rounds_file, terrain_file, course_file in files:
+            rounds = read_rounds(rounds_file)
+            if rounds is None:
+                # Unreadable files are spread by name, ToClippd will report them when processing the shard.
+                shard = shard_of(rounds_file, self.n_shards)
+                shards.setdefault(shard, []).append([rounds_file, terrain_file, course_file])
+                continue
+            rounds_by_shard = {}
+            for round_data in rounds:
+                rounds_by_shard.setdefault(shard_of(round_data["userId"], self.n_shards), []).append(round_data)
+            for shard, shard_rounds in rounds_by_shard.items():
+                if len(rounds_by_shard) > 1:
+                    rounds_file = self.__write_split(rounds_file, shard, shard_rounds)
+                shards.setdefault(shard, []).append([rounds_file, terrain_file, course_file])
+        return shards
+
+    def __write_split(self, rounds_file, shard, rounds):
+        """Writes the rounds of one shard of a rounds file to their own file, returns its path."""
+        directory = os.path.join(self.directory, "rounds")
+        os.makedirs(directory, exist_ok=True)
+        # The crc32 of the path tells apart the files of the same name in different directories.
+        stem = os.path.splitext(os.path.basename(rounds_file))[0]
+        path_crc = zlib.crc32(os.path.abspath(rounds_file).encode("utf-8"))
+        name = "{}_{:08x}.shard_{:05d}.json".format(stem, path_crc, shard)
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            json.dump(rounds, f)
+        return path
+
+    def submit(self, files):
+        """Partitions the chunks of files and adds the shards to the queue."""
+        for shard, chunks in sorted(self.partition(files).items()):
+            self.work_queue.add(shard, chunks)
+
+    @staticmethod
+    def __result_name(shard):
+        """Path of the result of a shard, relative to the directory as nodes may mount it at different places."""
+        return os.path.join("results", "shard_{:05d}.pkl".format(shard))
+
+    def __process_shard(self, shard, chunks, to_clippd):
+        """Processes the chunks of a shard and writes the result, returns its name, None if there is no data."""
+        frames = [to_clippd.process(self.source, *chunk) for chunk in chunks]
+        frames = [frame for frame in frames if frame is not None]
+        if not frames:
+            return None
+        name = self.__result_name(shard)
+        path = os.path.join(self.directory, name)
+        # Write to a temporary file first, so a reclaimed shard never leaves a partial result.
+        temporary_path = "{}.{}.{}.tmp".format(path, socket.gethostname(), os.getpid())
+        pd.concat(frames, ignore_index=True).to_pickle(temporary_path)
+        os.replace(temporary_path, path)
+        return name
+
+    def __send_heartbeats(self, shard, worker, stop):
+        while not stop.wait(self.heartbeat_interval):
+            if not self.work_queue.heartbeat(shard, worker):
+                return
+
+    def work(self, worker=None, to_clippd=None):
+        """
+        Claims and processes shards until every shard is done or failed.
+
+        Args:
+            worker: Name of the worker, host and process id by default
+            to_clippd: ToClippd used to process the rounds, a new one by default
+        Returns:
+            (int) Number of shards completed by this worker
+        """
+        if to_clippd is None:
+            # Imported here so that to_clippd can import this module.
+            from to_clippd.to_clippd import ToClippd
+
+            to_clippd = ToClippd()
+        worker = worker or "{}-{}".format(socket.gethostname(), os.getpid())
+        completed = 0
+        while True:
+            claimed = self.work_queue.claim(worker)
+            if claimed is None:
+                counts = self.work_queue.counts()
+                if not counts.get("pending") and not counts.get("claimed"):
+                    return completed
+                # Other workers hold the remaining shards, wait in case one of them stops.
+                time.sleep(self.poll_interval)
+                continue
+
+            shard, chunks = claimed
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self.__send_heartbeats, args=(shard, worker, stop), daemon=True)
+            heartbeat.start()
+            try:
+                result = self.__process_shard(shard, chunks, to_clippd)
+            except Exception as e:
+                print("Can't process shard", shard, e)
+                self.work_queue.fail(shard, worker)
+                continue
+            finally:
+                stop.set()
+                heartbeat.join()
+            if self.work_queue.complete(shard, worker, result):
+                completed += 1
+
+    def merge(self, allow_failed=False):
+        """
+        Puts the results of the done shards together.
+
+        Args:
+            allow_failed: If False, raises RuntimeError when some shards failed after max_attempts, as their rounds
+                          would be missing. If True, they are left out of the result
+        Returns:
+            None if no shard has data
+            (dataframe) Clippd Dataframe of all the shards, sorted like MapToClippd sorts each of them
+        """
+        failed = self.work_queue.failed()
+        if failed and not allow_failed:
+            raise RuntimeError("Shards {} failed, their rounds would be missing from the result.".format(
+                ", ".join(str(shard) for shard in failed)))
+        frames = [pd.read_pickle(os.path.join(self.directory, name))
+                  for _, name in self.work_queue.results() if name is not None]
+        if not frames:
+            return None
+        data = pd.concat(frames, ignore_index=True)
+        data.sort_values(by=["data_source", "player_id", "round_time", "round_id", "hole_id"], inplace=True)
+        data.reset_index(drop=True, inplace=True)
+        return data
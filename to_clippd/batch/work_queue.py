@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import time
+from contextlib import closing
+
+
+class WorkQueue(object):
+    """
+    Queue of shards to process, in an SQLite database that workers on several machines can share.
+
+    A worker claims a pending shard, sends heartbeats while it processes it, then completes it. A claimed shard
+    whose last heartbeat is older than timeout is considered lost and can be claimed again by another worker; the
+    late worker can't complete it anymore. Every change is one short transaction, so the database can live on a
+    shared filesystem, as long as it supports file locks.
+
+    Attributes:
+        path: Path of the SQLite database
+        timeout: Seconds without heartbeat after which a claimed shard can be claimed again
+        max_attempts: Number of failed attempts after which a shard is marked as failed
+    """
+
+    def __init__(self, path, timeout=300, max_attempts=3):
+        self.path = path
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        with closing(self.__connect()) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS shards ("
+                               "id INTEGER PRIMARY KEY, "
+                               "payload TEXT NOT NULL, "
+                               "status TEXT NOT NULL DEFAULT 'pending', "
+                               "worker TEXT, "
+                               "heartbeat REAL, "
+                               "attempts INTEGER NOT NULL DEFAULT 0, "
+                               "result TEXT)")
+
+    def __connect(self):
+        """Opens a connection in autocommit mode, transactions are started explicitly."""
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def add(self, shard_id, payload):
+        """Adds a shard with a JSON serializable payload, does nothing if the shard is already in the queue."""
+        with closing(self.__connect()) as connection:
+            connection.execute("INSERT OR IGNORE INTO shards (id, payload) VALUES (?, ?)",
+                               (shard_id, json.dumps(payload)))
+
+    def claim(self, worker):
+        """
+        Claims a pending shard, or a claimed shard whose worker stopped sending heartbeats.
+
+        Args:
+            worker: Name of the worker
+        Returns:
+            None if there is no shard to claim
+            (tuple) id and payload of the shard
+        """
+        now = time.time()
+        with closing(self.__connect()) as connection:
+            # BEGIN IMMEDIATE takes the write lock, so two workers can't claim the same shard.
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT id, payload FROM shards "
+                                     "WHERE status = 'pending' OR (status = 'claimed' AND heartbeat < ?) "
+                                     "ORDER BY id LIMIT 1",
+                                     (now - self.timeout,)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE shards SET status = 'claimed', worker = ?, heartbeat = ? WHERE id = ?",
+                                   (worker, now, row[0]))
+            connection.execute("COMMIT")
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def __update_claimed(self, sql, parameters, shard_id, worker):
+        """Runs an update on a shard only if worker still holds it, returns True if it did."""
+        with closing(self.__connect()) as connection:
+            cursor = connection.execute(sql + " WHERE id = ? AND worker = ? AND status = 'claimed'",
+                                        parameters + (shard_id, worker))
+            return cursor.rowcount == 1
+
+    def heartbeat(self, shard_id, worker):
+        """Tells that worker is still processing the shard, returns False if the shard was claimed by another."""
+        return self.__update_claimed("UPDATE shards SET heartbeat = ?", (time.time(),), shard_id, worker)
+
+    def complete(self, shard_id, worker, result=None):
+        """Marks the shard as done with its JSON serializable result, returns False if worker lost the shard."""
+        return self.__update_claimed("UPDATE shards SET status = 'done', result = ?", (json.dumps(result),),
+                                     shard_id, worker)
+
+    def fail(self, shard_id, worker):
+        """Puts the shard back in the queue, or marks it as failed after max_attempts."""
+        return self.__update_claimed("UPDATE shards SET attempts = attempts + 1, "
+                                     "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END",
+                                     (self.max_attempts,), shard_id, worker)
+
+    def counts(self):
+        """Returns the number of shards of each status."""
+        with closing(self.__connect()) as connection:
+            return dict(connection.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall())
+
+    def failed(self):
+        """Returns the ids of the failed shards, by id."""
+        with closing(self.__connect()) as connection:
+            rows = connection.execute("SELECT id FROM shards WHERE status = 'failed' ORDER BY id").fetchall()
+        return [shard_id for shard_id, in rows]
+
+    def results(self):
+        """Returns the (id, result) of the done shards, by id."""
+        with closing(self.__connect()) as connection:
+            rows = connection.execute("SELECT id, result FROM shards WHERE status = 'done' ORDER BY id").fetchall()
+        return [(shard_id, json.loads(result)) for shard_id, result in rows]
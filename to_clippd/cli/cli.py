@@ -0,0 +1,202 @@
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from to_clippd.derive_insights.geodesic_cache import GeodesicCache
+from to_clippd.map_to_clippd.external_sort import ExternalSort
+from to_clippd.map_to_clippd.external_sort import SORT_KEY
+from to_clippd.to_clippd import ToClippd
+
+# Name of the geodesic cache file in the cache directory.
+GEODESIC_CACHE_FILE = "geodesic_cache.pkl"
+
+# Output format of each extension.
+FORMATS = {".csv": "csv", ".pkl": "pickle", ".pickle": "pickle", ".parquet": "parquet"}
+
+
+def find_files(inputs, rounds_name="round.json", terrain_name="terrain.json", course_name=None):
+    """
+    Finds the (rounds_file, terrain_file, course_file) of each input.
+
+    An input is a directory with the files of some rounds, a rounds file (its directory is used), or a glob of
+    them. The course file is course_name, or the only other json file of the directory when it is None.
+
+    Args:
+        inputs: Paths or globs
+        rounds_name: Name of the rounds file in each directory
+        terrain_name: Name of the terrain file in each directory
+        course_name: Name of the course file in each directory
+    Returns:
+        (list) Sorted (rounds_file, terrain_file, course_file), without the directories missing a file
+    """
+    directories = set()
+    for pattern in inputs:
+        paths = glob.glob(pattern) if glob.has_magic(pattern) else [pattern]
+        if not paths:
+            print("No file matches", pattern, file=sys.stderr)
+        for path in paths:
+            directories.add(path if os.path.isdir(path) else os.path.dirname(path) or ".")
+
+    files = []
+    for directory in sorted(directories):
+        if course_name is None:
+            courses = [name for name in sorted(os.listdir(directory))
+                       if name.endswith(".json") and name not in (rounds_name, terrain_name)]
+            if len(courses) != 1:
+                print("Can't find the course file in", directory, file=sys.stderr)
+                continue
+            course_file = os.path.join(directory, courses[0])
+        else:
+            course_file = os.path.join(directory, course_name)
+        files.append((os.path.join(directory, rounds_name), os.path.join(directory, terrain_name), course_file))
+    return files
+
+
+def write(parts, output, output_format):
+    """
+    Writes the sorted parts of a Clippd Dataframe, one at a time for csv.
+
+    Returns:
+        (int) Number of rows written
+    """
+    rows = 0
+    if output_format == "csv":
+        with open(output, "w", newline="") as f:
+            for part in parts:
+                part.to_csv(f, header=not rows, index=False)
+                rows += len(part)
+        return rows
+    parts = list(parts)
+    if not parts:
+        return 0
+    data = pd.concat(parts)
+    if output_format == "pickle":
+        data.to_pickle(output)
+    else:
+        data.to_parquet(output)
+    return len(data)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="to_clippd",
+                                     description="Turns the files of an external source into one Clippd Dataframe.")
+    parser.add_argument("inputs", nargs="+",
+                        help="Directories with a rounds, a terrain and a course file, rounds files, or globs of them")
+    parser.add_argument("-o", "--output", required=True, help="File to write the Clippd Dataframe to")
+    parser.add_argument("-f", "--format", choices=sorted(set(FORMATS.values())),
+                        help="Format of the output, from its extension by default (csv otherwise)")
+    parser.add_argument("-s", "--source", default="arccos", help="Name of the external source (default: arccos)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of processes deriving the insights, split by player (default: 1)")
+    parser.add_argument("-c", "--chunk-size", type=int, default=1,
+                        help="Number of inputs processed together as one chunk (default: 1)")
+    parser.add_argument("--cache-dir",
+                        help="Directory of the working files (sorted runs spilled to disk) and of the geodesic "
+                             "cache kept from one run to the next (default: a temporary directory, without cache)")
+    parser.add_argument("--geodesic-cache-size", type=int, default=100000,
+                        help="Maximum number of distances in the geodesic cache (default: 100000)")
+    parser.add_argument("--memory-limit", type=float, default=256,
+                        help="Megabytes of output rows kept in memory before spilling them to disk (default: 256)")
+    parser.add_argument("--rounds-name", default="round.json", help="Name of the rounds files (default: round.json)")
+    parser.add_argument("--terrain-name", default="terrain.json",
+                        help="Name of the terrain files (default: terrain.json)")
+    parser.add_argument("--course-name", help="Name of the course files (default: the other json file)")
+    parser.add_argument("--profile", nargs="?", const="-",
+                        help="Writes the time spent in each stage to this file, or to stderr without a file")
+    args = parser.parse_args(argv)
+    if args.jobs < 1 or args.chunk_size < 1:
+        parser.error("--jobs and --chunk-size must be at least 1")
+    if args.format is None:
+        args.format = FORMATS.get(os.path.splitext(args.output)[1].lower(), "csv")
+    return args
+
+
+def format_profile(to_clippd, seconds):
+    """
+    Returns the report of the pipeline stages followed by the times of the steps run after them, and the use of
+    the geodesic cache.
+    """
+    lines = [to_clippd.pipeline.format_report(), ""]
+    lines += ["{:<22} {:>10.3f}".format(step + " (s)", value) for step, value in seconds.items()]
+    if to_clippd.geodesic_cache is not None:
+        stats = to_clippd.geodesic_cache.stats()
+        lines += ["", "geodesic cache: {size} distances, {hits} hits, {misses} misses, {evictions} evictions".format(
+            **stats)]
+        if stats["hit_rate"] is not None:
+            lines[-1] += ", {:.1%} hit rate".format(stats["hit_rate"])
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    """
+    Runs ToClippd on the inputs given on the command line and writes one sorted Clippd Dataframe.
+
+    Returns:
+        (int) Exit status, 1 if no input gives any data or if a chunk is dropped (its files can't be processed)
+    """
+    args = parse_args(argv)
+    start = time.perf_counter()
+    files = find_files(args.inputs, args.rounds_name, args.terrain_name, args.course_name)
+    if not files:
+        print("No input to process.", file=sys.stderr)
+        return 1
+
+    geodesic_cache = None
+    if args.cache_dir:
+        os.makedirs(args.cache_dir, exist_ok=True)
+        cache_file = os.path.join(args.cache_dir, GEODESIC_CACHE_FILE)
+        if os.path.exists(cache_file):
+            geodesic_cache = GeodesicCache.load(cache_file, args.geodesic_cache_size)
+        else:
+            geodesic_cache = GeodesicCache(args.geodesic_cache_size)
+    # The tools are built when process_batch first uses them, after the inputs are found.
+    to_clippd = ToClippd(fast_start=True, jobs=args.jobs, geodesic_cache=geodesic_cache)
+    # The chunks are sorted separately, so they are merged (on disk if needed) into one sorted output.
+    # shot_id breaks the ties like MapToClippd does within a chunk.
+    external_sort = ExternalSort(by=SORT_KEY + ["shot_id"], memory_limit=args.memory_limit * 2 ** 20,
+                                 directory=tempfile.mkdtemp(prefix="to_clippd_", dir=args.cache_dir))
+    chunks = [files[start:start + args.chunk_size] for start in range(0, len(files), args.chunk_size)]
+    dropped = []
+    try:
+        for i, data in enumerate(to_clippd.process_batch(args.source, files, chunk_size=args.chunk_size)):
+            if data is None:
+                dropped.append(chunks[i])
+            external_sort.add(data)
+        processed = time.perf_counter()
+        rows = write(external_sort.merge(), args.output, args.format)
+    finally:
+        external_sort.close()
+        os.rmdir(external_sort.directory)
+        to_clippd.derive_insights.close()
+    written = time.perf_counter()
+    if geodesic_cache is not None:
+        geodesic_cache.save(cache_file)
+
+    for error in to_clippd.read_errors:
+        if error["index"] is None:
+            print("Can't read {file}: {errors}".format(**error), file=sys.stderr)
+        else:
+            print("Invalid round {roundId} in {file}: {errors}".format(**error), file=sys.stderr)
+    for chunk in dropped:
+        print("Dropped chunk, no data from:", ", ".join(rounds_file for rounds_file, _, _ in chunk), file=sys.stderr)
+    if args.profile:
+        profile = format_profile(to_clippd, {"process": processed - start, "sort and write": written - processed,
+                                             "total": written - start})
+        if args.profile == "-":
+            sys.stderr.write(profile)
+        else:
+            with open(args.profile, "w") as f:
+                f.write(profile)
+    if not rows:
+        print("No data to write.", file=sys.stderr)
+        return 1
+    return 1 if dropped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
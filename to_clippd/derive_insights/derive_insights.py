@@ -1,13 +1,12 @@
 import os
 
-import derive_insights.shot_misses as shot_misses
-import derive_insights.stroke_gained as stroke_gained
 import numpy as np
 import pandas as pd
-import seaborn as sns
-from geopy import distance
-from scipy.interpolate import interp1d
-from scipy.stats import zscore
+
+import to_clippd.derive_insights.parallel as parallel
+import to_clippd.derive_insights.shot_misses as shot_misses
+import to_clippd.derive_insights.shot_statistics as shot_statistics
+import to_clippd.derive_insights.stroke_gained as stroke_gained
 
 # get the location of this script so we can read in local files
 # otherwise we have problems were we can"t find the files
@@ -19,6 +18,50 @@ try:
 except Exception:
     __location__ = ""
 
+# Latitude and longitude columns of each point of a shot.
+COORDINATE_COLUMNS = {"start": ("shot_startLat", "shot_startLong"),
+                      "end": ("shot_endLat", "shot_endLong"),
+                      "pin": ("hole_pinLat", "hole_pinLong")}
+
+
+def coordinates(data, point):
+    """
+    Returns the coordinates of one point of the shots as an (n, 2) float64 array of latitudes and longitudes.
+
+    Args:
+        data: Dataframe containing shots data
+        point: "start", "end" or "pin"
+    """
+    return data[list(COORDINATE_COLUMNS[point])].to_numpy(dtype=np.float64)
+
+
+def distance_yards(data, from_point, to_point, cache=None):
+    """
+    Calculates the geodesic distance in yards between two points of each shot.
+
+    Args:
+        data: Dataframe containing shots data
+        from_point: "start", "end" or "pin"
+        to_point: "start", "end" or "pin"
+        cache: Optional GeodesicCache, only the distances it doesn't have are calculated
+    Returns:
+        (array) float64 distances in yards
+    """
+    from_lat, from_long = COORDINATE_COLUMNS[from_point]
+    to_lat, to_long = COORDINATE_COLUMNS[to_point]
+    if cache is not None:
+        return cache.distance_yards(data[from_lat].values, data[from_long].values,
+                                    data[to_lat].values, data[to_long].values)
+
+    # I wanted to change it with a function that can take numpy arrays directly,
+    # but because the results were slightly different geopy is still called for each pair of points.
+    # Heavy optional dependencies are imported when first used, to keep the import of this module fast.
+    from geopy import distance
+
+    pairs = zip(data[from_lat].values, data[from_long].values, data[to_lat].values, data[to_long].values)
+    return np.fromiter((distance.distance((lat1, long1), (lat2, long2)).ft / 3 for lat1, long1, lat2, long2 in pairs),
+                       dtype=np.float64, count=len(data))
+
 
 class DeriveInsights(object):
     """
@@ -26,46 +69,41 @@ class DeriveInsights(object):
 
     Attributes:
         lie_dict: Used to convert to Clippd lie names
-        tee_app_arg: This is PGA Benchmark
-        put: This PGA putting benchmark
-        expected_shots_functions: Dict of all the interpolation functions
+        benchmark_files: Dict of benchmark name -> (benchmark csv, putting benchmark csv), PGA by default.
+                         The first benchmark gives strokes_gained_calculated, each other benchmark gives
+                         strokes_gained_calculated_<name>
+        benchmarks: StrokesGainedBenchmarks of all the benchmarks
+        geometry_dtype: Float type used to calculate the miss bearings and distances
+        coordinate_tuples: If True, adds the (lat, long) tuple columns start_coordinates, end_coordinates and
+                           pin_coordinates to the output, for the consumers still expecting them
+        running_statistics: Optional RunningShotStatistics. If given, each processed dataframe is added to it and
+                            the z-scores are calculated against the whole history it holds
+        jobs: Number of worker processes. If more than 1, the shots are split by player into balanced shards that
+              are processed in parallel, with the same output as a single process
+        geodesic_cache: Optional GeodesicCache of the distances, kept across calls to process. Worker processes
+                        start with a copy of it, and the distances they look up are merged back into it
     """
 
-    def __init__(self):
+    def __init__(self, geometry_dtype=np.float64, coordinate_tuples=False, running_statistics=None, jobs=1,
+                 benchmarks=None, geodesic_cache=None):
+        if jobs > 1 and running_statistics is not None:
+            raise ValueError("running_statistics can't be updated from several processes, use jobs=1.")
+        self.jobs = jobs
+        self._executor = None
+        self.running_statistics = running_statistics
+        self.geometry_dtype = geometry_dtype
+        self.coordinate_tuples = coordinate_tuples
+        self.geodesic_cache = geodesic_cache
         self.lie_dict = {"tee": "Tee", "fairway": "Fairway", "rough": "Rough",
                          "sand": "Sand", "green": "Green", "Green": "Green",
                          "In The Hole": "In The Hole"}
-        # Import PGA benchmark
-        self.tee_app_arg = pd.read_csv(os.path.join(__location__, "PGA Benchmark.csv"))
-        self.put = pd.read_csv(os.path.join(__location__, "PGA Putting Benchmark.csv"))
-        self.put["Distance"] = self.put["Distance (feet)"] / 3
-
-        # Set up interpolation functions.
-        expected_shots_tee = interp1d(self.tee_app_arg[["Distance", "Tee"]].dropna()["Distance"],
-                                      self.tee_app_arg[["Distance", "Tee"]].dropna()["Tee"],
-                                      kind="linear",
-                                      fill_value="extrapolation")
-        expected_shots_fairway = interp1d(self.tee_app_arg[["Distance", "Fairway"]].dropna()["Distance"],
-                                          self.tee_app_arg[["Distance", "Fairway"]].dropna()["Fairway"],
-                                          kind="linear",
-                                          fill_value="extrapolation")
-        expected_shots_rough = interp1d(self.tee_app_arg[["Distance", "Rough"]].dropna()["Distance"],
-                                        self.tee_app_arg[["Distance", "Rough"]].dropna()["Rough"],
-                                        kind="linear",
-                                        fill_value="extrapolation")
-        expected_shots_sand = interp1d(self.tee_app_arg[["Distance", "Sand"]].dropna()["Distance"],
-                                       self.tee_app_arg[["Distance", "Sand"]].dropna()["Sand"],
-                                       kind="linear",
-                                       fill_value="extrapolation")
-        expected_shots_green = interp1d(self.put["Distance"], self.put["Expected putts"], kind="linear")
-
-        self.expected_shots_functions = {
-            "expected_shots_tee": expected_shots_tee,
-            "expected_shots_fairway": expected_shots_fairway,
-            "expected_shots_rough": expected_shots_rough,
-            "expected_shots_sand": expected_shots_sand,
-            "expected_shots_green": expected_shots_green
-        }
+        # Import benchmarks, the first one gives strokes_gained_calculated.
+        if benchmarks is None:
+            benchmarks = {"PGA": (os.path.join(__location__, "PGA Benchmark.csv"),
+                                  os.path.join(__location__, "PGA Putting Benchmark.csv"))}
+        self.benchmark_files = benchmarks
+        self.benchmarks = stroke_gained.StrokesGainedBenchmarks(
+            {name: stroke_gained.read_benchmark(*files) for name, files in benchmarks.items()})
 
     def __deduct_shot_values(self, data):
         """
@@ -90,8 +128,7 @@ class DeriveInsights(object):
         data["shot_endTerrain"] = data["shot_endTerrain"].map(self.lie_dict)
         return data
 
-    @staticmethod
-    def __calculate_shot_distance(data):
+    def __calculate_shot_distance(self, data):
         """
         Calculates the distance using the using start and end coordinates.
         Args:
@@ -99,43 +136,35 @@ class DeriveInsights(object):
         Returns:
             (dataframe) returned with the distances calculated
         """
+        # Keep the coordinates as float64 columns, there is no need to build one tuple per point.
+        for columns in COORDINATE_COLUMNS.values():
+            for column in columns:
+                data[column] = data[column].astype(np.float64)
+
         # Calculate starting distance for each shot.
-        data["start_coordinates"] = list(zip(data["shot_startLat"],
-                                             data["shot_startLong"]))
-        data["pin_coordinates"] = list(zip(data["hole_pinLat"],
-                                           data["hole_pinLong"]))
-
-        # I wanted to changed it with a function that can take numpy arrays directly,
-        # but because the results were slightly different I only vectorized the function.
-        vect_distance = np.vectorize(distance.distance)
-        result = vect_distance(data["start_coordinates"], data["pin_coordinates"])
-        data["shot_start_distance_yards"] = [obj.ft / 3 for obj in result]
-
-        # Fill NaNs in end latitudes and longitudes and create end_coordinates column.
-        data["shot_endLat"].fillna(data["hole_pinLat"], inplace=True)
-        data["shot_endLong"].fillna(data["hole_pinLong"], inplace=True)
-        data["end_coordinates"] = list(zip(data["shot_endLat"],
-                                           data["shot_endLong"]))
+        data["shot_start_distance_yards"] = distance_yards(data, "start", "pin", self.geodesic_cache)
+
+        # Fill NaNs in end latitudes and longitudes.
+        data["shot_endLat"] = data["shot_endLat"].fillna(data["hole_pinLat"])
+        data["shot_endLong"] = data["shot_endLong"].fillna(data["hole_pinLong"])
 
         # Calculate shot distance in yards using start and end coordinates.
-        result = vect_distance(data["start_coordinates"], data["end_coordinates"])
-        data["shot_distance_yards_calculated"] = [obj.ft / 3 for obj in result]
+        data["shot_distance_yards_calculated"] = distance_yards(data, "start", "end", self.geodesic_cache)
 
         # Calculate end distance for each shot.
-        result = vect_distance(data["end_coordinates"], data["pin_coordinates"])
-        data["shot_end_distance_yards"] = [obj.ft / 3 for obj in result]
-        data["shot_end_distance_yards"].fillna(0, inplace=True)
+        data["shot_end_distance_yards"] = distance_yards(data, "end", "pin", self.geodesic_cache)
+        data["shot_end_distance_yards"] = data["shot_end_distance_yards"].fillna(0)
 
         # Take hole length as the distance to CG for first shot.
         data["hole_yards"] = np.where(data["shot_shotId"] == 1,
                                       data["shot_startDistanceToCG"],
                                       np.nan)
-        data["hole_yards"].ffill(inplace=True)
+        # Per player, so the shards of players give the same hole lengths as a single process.
+        data["hole_yards"] = data.groupby("round_userId", dropna=False, sort=False)["hole_yards"].ffill()
         data["hole_yards"] = pd.to_numeric(data["hole_yards"])
         return data
 
-    @staticmethod
-    def __impute_shot_type(data):
+    def __impute_shot_type(self, data):
         """
         Impute shot type and shot sub_type.
 
@@ -151,11 +180,14 @@ class DeriveInsights(object):
         data["shot_type"] = np.select(conditions, values, default="ApproachShot")
 
         # Calculate z-scores for shot distance and start distance and by club and shot type.
-
-        data["shot_distance_yards_zscore"] = (data.groupby(["round_userId", "shot_type", "shot_clubType"])
-                                              ["shot_distance_yards_calculated"].transform(zscore, ddof=1)).fillna(0)
-        data["shot_start_distance_yards_zscore"] = (data.groupby(["round_userId", "shot_type", "shot_clubType"])
-                                                    ["shot_start_distance_yards"].transform(zscore, ddof=1)).fillna(0)
+        if self.running_statistics is None:
+            zscores = shot_statistics.group_zscores(data)
+        else:
+            self.running_statistics.update(data)
+            zscores = self.running_statistics.zscores(data)
+        zscores = zscores.fillna(0)
+        data["shot_distance_yards_zscore"] = zscores["shot_distance_yards_calculated"]
+        data["shot_start_distance_yards_zscore"] = zscores["shot_start_distance_yards"]
 
         # Impute shot subtype.
         conditions = [data["shot_type"] == "TeeShot",
@@ -169,6 +201,8 @@ class DeriveInsights(object):
 
     def plot_shot_subtypes(self, data):
         """Plot the subtypes plot to check the shot subtype logic"""
+        import seaborn as sns
+
         self.__impute_shot_type(data)
         # Check shot subtype logic.
         sns.jointplot(data=data[data["shot_type"] == "ApproachShot"],
@@ -182,8 +216,7 @@ class DeriveInsights(object):
                       hue="shot_subtype",
                       height=6)
 
-    @staticmethod
-    def __calculate_shot_miss_directions_and_distances(data):
+    def __calculate_shot_miss_directions_and_distances(self, data):
         """
         Determine shot miss directions and distances using coordinates and indicators.
 
@@ -192,34 +225,19 @@ class DeriveInsights(object):
         Returns:
             (dataframe) returned with the miss direction and the miss distance
         """
-        # Determine miss direction.
-        data["start_to_end_bearing"] = shot_misses.get_bearing(data["start_coordinates"].str[0].values,
-                                                               data["start_coordinates"].str[1].values,
-                                                               data["end_coordinates"].str[0].values,
-                                                               data["end_coordinates"].str[1].values)
-        data["start_to_pin_bearing"] = shot_misses.get_bearing(data["start_coordinates"].str[0].values,
-                                                               data["start_coordinates"].str[1].values,
-                                                               data["pin_coordinates"].str[0].values,
-                                                               data["pin_coordinates"].str[1].values)
-        data["miss_bearing_left_right"] = data["start_to_end_bearing"] - data[
-            "start_to_pin_bearing"]
-        data["miss_bearing_left_right"] = np.where(data["miss_bearing_left_right"] < 0,
-                                                   data["miss_bearing_left_right"] + 360,
-                                                   data["miss_bearing_left_right"])
-
-        # Determine miss distances.
-        data["end_to_pin_bearing"] = shot_misses.get_bearing(data["end_coordinates"].str[0].values,
-                                                             data["end_coordinates"].str[1].values,
-                                                             data["pin_coordinates"].str[0].values,
-                                                             data["pin_coordinates"].str[1].values)
-        data["start_end_pin_angle"] = shot_misses.calculate_start_end_pin_angle(
-            data["shot_distance_yards_calculated"],
-            data["shot_start_distance_yards"],
-            data["shot_end_distance_yards"])
-        [data["shot_miss_distance_left_right"],
-         data["shot_miss_distance_short_long"]] = shot_misses.calculate_miss_distance(data["miss_bearing_left_right"],
-                                                                                      data["start_end_pin_angle"],
-                                                                                      data["shot_end_distance_yards"])
+        # Determine miss bearings, angles and distances in one pass over the coordinates.
+        geometry = shot_misses.calculate_shot_geometry(data["shot_startLat"].values,
+                                                       data["shot_startLong"].values,
+                                                       data["shot_endLat"].values,
+                                                       data["shot_endLong"].values,
+                                                       data["hole_pinLat"].values,
+                                                       data["hole_pinLong"].values,
+                                                       data["shot_distance_yards_calculated"].values,
+                                                       data["shot_start_distance_yards"].values,
+                                                       data["shot_end_distance_yards"].values,
+                                                       dtype=self.geometry_dtype)
+        for column, values in geometry.items():
+            data[column] = values
 
         # Impute left/right and short_long miss directions for approach shots.
         conditions = [(data["shot_type"] == "ApproachShot") & (data["hole_isGir"] is False) & (data["shot_miss_distance_left_right"] < 0),
@@ -262,14 +280,62 @@ class DeriveInsights(object):
         """
         if data is None:
             return None
+        if self.jobs > 1:
+            shards = parallel.shard_by_player(data, self.jobs)
+            if len(shards) > 1:
+                return self.__process_shards(data, shards)
+        return self.__process(data)
+
+    def __process_shards(self, data, shards):
+        """
+        Derives the insights of each shard of players in the worker processes and puts the shards back together.
+
+        Every grouped computation is done per player, so the shards are independent. The shots of a player keep
+        their relative order in their shard and sorting on several columns is stable, so the order is the same as
+        in a single process.
+
+        Args:
+            data: Dataframe containing shots data
+            shards: Positions of the shots of each shard, from parallel.shard_by_player
+        Returns:
+            (dataframe) With all the derived insights
+        """
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            kwargs = {"geometry_dtype": self.geometry_dtype, "coordinate_tuples": self.coordinate_tuples,
+                      "benchmarks": self.benchmark_files, "geodesic_cache": self.geodesic_cache}
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs,
+                                                 initializer=parallel.init_worker,
+                                                 initargs=(DeriveInsights, kwargs))
+        results = list(self._executor.map(parallel.process_shard, [data.iloc[positions] for positions in shards]))
+        for _, changes in results:
+            if changes is not None:
+                self.geodesic_cache.merge(changes)
+        data = pd.concat([shard for shard, _ in results])
+        data.sort_values(by=["round_userId", "round_startTime", "roundId", "hole_holeId", "shot_shotId"],
+                         inplace=True)
+        return data
+
+    def __getstate__(self):
+        """The worker processes stay with this instance, a copy sent to another process starts without them."""
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
 
+    def close(self):
+        """Shuts down the worker processes, if any were started."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __process(self, data):
+        """Derives the insights of data in this process."""
         data = self.__deduct_shot_values(data)
         data = self.__calculate_shot_distance(data)
         data = self.__impute_shot_type(data)
         data = self.__calculate_shot_miss_directions_and_distances(data)
 
-        # Strokes gained using PGA benchmark.
-
         # Impute next shot number.
         data.sort_values(by=["round_userId", "round_startTime", "roundId", "hole_holeId", "shot_shotId"],
                          inplace=True)
@@ -278,15 +344,19 @@ class DeriveInsights(object):
                                                  "roundId",
                                                  "hole_holeId"])["shot_shotId"].shift(-1)
 
-        # Calculate strokes gained.
-        vect_func = np.vectorize(stroke_gained.strokes_gained_calculation)
-        data["strokes_gained_calculated"] = vect_func(data["shot_startTerrain"],
-                                                      data["shot_start_distance_yards"],
-                                                      data["shot_endTerrain"],
-                                                      data["shot_end_distance_yards"],
-                                                      data["shot_shotId"],
-                                                      data["next_shot_shotId"],
-                                                      stroke_gained.expected_shots,
-                                                      self.expected_shots_functions)
+        # Calculate strokes gained against every benchmark in one pass.
+        strokes_gained = self.benchmarks.strokes_gained(data["shot_startTerrain"].values,
+                                                        data["shot_start_distance_yards"].values,
+                                                        data["shot_endTerrain"].values,
+                                                        data["shot_end_distance_yards"].values,
+                                                        data["shot_shotId"].values,
+                                                        data["next_shot_shotId"].values)
+        for i, name in enumerate(self.benchmarks.names):
+            column = "strokes_gained_calculated" if i == 0 else "strokes_gained_calculated_" + name
+            data[column] = strokes_gained[i]
+
+        if self.coordinate_tuples:
+            for point, (lat, long) in COORDINATE_COLUMNS.items():
+                data[point + "_coordinates"] = list(zip(data[lat], data[long]))
 
         return data
@@ -0,0 +1,131 @@
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+
+
+class GeodesicCache(object):
+    """
+    Bounded cache of the geodesic distances between pairs of points, evicting the least recently used pairs.
+
+    The tees and pins of a course come back in every round played on it, so their distances are only computed
+    once by geopy. Points are keyed on their coordinates rounded to precision decimals (6 decimals is about
+    10 cm), so a pair within that of a cached one gets its distance. Bearings are not cached: they are computed
+    for all the shots at once with numpy (see shot_misses), which is faster than a lookup per shot.
+
+    Attributes:
+        max_size: Maximum number of pairs kept
+        precision: Number of decimals of the coordinates in the keys, None to key on the exact coordinates
+        entries: OrderedDict of (lat1, long1, lat2, long2) -> distance in yards, the most recently used last
+        hits: Number of distances found in the cache
+        misses: Number of distances calculated
+        evictions: Number of pairs removed to stay under max_size
+        touched: OrderedDict of the keys looked up since track_changes, the most recently used last, None before
+    """
+
+    def __init__(self, max_size=100000, precision=6, entries=None):
+        self.max_size = max_size
+        self.precision = precision
+        self.entries = OrderedDict() if entries is None else OrderedDict(entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.touched = None
+
+    @classmethod
+    def load(cls, path, max_size=100000):
+        """Loads a cache saved with save, keeping the most recently used pairs if there are more than max_size."""
+        with open(path, "rb") as f:
+            precision, entries = pickle.load(f)
+        return cls(max_size, precision, entries[-max_size:])
+
+    def save(self, path):
+        """Saves the pairs and their order to a pickle file."""
+        with open(path, "wb") as f:
+            pickle.dump((self.precision, list(self.entries.items())), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @property
+    def hit_rate(self):
+        """Share of the distances found in the cache, None before any lookup."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    def stats(self):
+        """Returns the size, hits, misses, evictions and hit rate of the cache."""
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hit_rate}
+
+    def track_changes(self):
+        """
+        Starts recording the pairs looked up, to get them with changes_since.
+
+        Returns:
+            (tuple) The hits, misses and evictions so far, to give to changes_since
+        """
+        self.touched = OrderedDict()
+        return self.hits, self.misses, self.evictions
+
+    def changes_since(self, counters):
+        """
+        Returns the pairs looked up and the counts of the lookups made since track_changes, to merge into another copy.
+
+        The pairs are in the order of their last lookup, without the ones evicted since.
+        """
+        entries = self.entries
+        pairs = [(key, entries[key]) for key in self.touched if key in entries]
+        return {"pairs": pairs, "hits": self.hits - counters[0], "misses": self.misses - counters[1]}
+
+    def merge(self, changes):
+        """Adds the pairs and counts of changes_since of a copy of this cache, as if the lookups were made here."""
+        entries = self.entries
+        for key, value in changes["pairs"]:
+            entries[key] = value
+            entries.move_to_end(key)
+            if len(entries) > self.max_size:
+                entries.popitem(last=False)
+                self.evictions += 1
+        self.hits += changes["hits"]
+        self.misses += changes["misses"]
+
+    def distance_yards(self, from_lat, from_long, to_lat, to_long):
+        """
+        Returns the geodesic distances in yards between pairs of points, calculating only the ones not cached.
+
+        Args:
+            from_lat: Array of the latitudes of the first points
+            from_long: Array of the longitudes of the first points
+            to_lat: Array of the latitudes of the second points
+            to_long: Array of the longitudes of the second points
+        Returns:
+            (array) float64 distances in yards
+        """
+        from geopy import distance
+
+        points = np.column_stack([from_lat, from_long, to_lat, to_long]).astype(np.float64)
+        keys = points if self.precision is None else np.round(points, self.precision)
+        # Pairs with a missing coordinate can't be cached (NaN keys never match), geopy raises on them as before.
+        finite = np.isfinite(keys).all(axis=1)
+        entries = self.entries
+        touched = self.touched
+        result = np.empty(len(points), dtype=np.float64)
+        for i, key in enumerate(map(tuple, keys.tolist())):
+            value = entries.get(key)
+            if value is not None:
+                self.hits += 1
+                entries.move_to_end(key)
+            else:
+                lat1, long1, lat2, long2 = points[i]
+                value = distance.distance((lat1, long1), (lat2, long2)).ft / 3
+                self.misses += 1
+                if not finite[i]:
+                    result[i] = value
+                    continue
+                entries[key] = value
+                if len(entries) > self.max_size:
+                    entries.popitem(last=False)
+                    self.evictions += 1
+            if touched is not None:
+                touched[key] = None
+                touched.move_to_end(key)
+            result[i] = value
+        return result
@@ -0,0 +1,57 @@
+import heapq
+
+import numpy as np
+
+# DeriveInsights instance of the worker process, created once by init_worker.
+_worker = None
+
+
+def shard_by_player(data, n_shards, key="round_userId"):
+    """
+    Splits the shots into shards of whole players, balanced by number of shots.
+
+    Players are given, largest first, to the shard with the fewest shots. Within a shard, the shots keep the order
+    they have in data.
+
+    Args:
+        data: Dataframe containing shots data
+        n_shards: Maximum number of shards
+        key: Column identifying a player
+    Returns:
+        (list) Sorted array of the positions in data of the shots of each shard, without empty shards
+    """
+    codes, players = data[key].factorize()
+    sizes = np.bincount(codes[codes >= 0], minlength=len(players))
+    # One shard at least, for the shots without a player.
+    shards = [(0, i) for i in range(max(1, min(n_shards, len(players))))]
+    shard_of_player = np.empty(len(players), dtype=np.int64)
+    for player in np.argsort(-sizes, kind="stable"):
+        size, shard = heapq.heappop(shards)
+        shard_of_player[player] = shard
+        heapq.heappush(shards, (size + sizes[player], shard))
+    # Shots without a player go to the first shard.
+    shard_of_shot = np.zeros(len(codes), dtype=np.int64)
+    shard_of_shot[codes >= 0] = shard_of_player[codes[codes >= 0]]
+    return [positions for positions in (np.flatnonzero(shard_of_shot == shard) for shard in range(len(shards)))
+            if len(positions)]
+
+
+def init_worker(derive_insights_class, kwargs):
+    """Creates the DeriveInsights of the worker, so the benchmarks are loaded once per process."""
+    global _worker
+    _worker = derive_insights_class(**kwargs)
+
+
+def process_shard(data):
+    """
+    Derives the insights of one shard in the worker process.
+
+    Returns:
+        (tuple) The derived shard, and the changes of the geodesic cache of the worker (None without a cache)
+    """
+    cache = _worker.geodesic_cache
+    if cache is None:
+        return _worker.process(data), None
+    counters = cache.track_changes()
+    data = _worker.process(data)
+    return data, cache.changes_since(counters)
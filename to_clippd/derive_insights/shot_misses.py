@@ -48,3 +48,112 @@ def calculate_miss_distance(miss_bearing_left_right, start_end_pin_angle, shot_e
     )
 
     return distance_left_right, distance_short_long
+
+
+GEOMETRY_FIELDS = ("start_to_end_bearing", "start_to_pin_bearing", "end_to_pin_bearing",
+                   "miss_bearing_left_right", "start_end_pin_angle",
+                   "shot_miss_distance_left_right", "shot_miss_distance_short_long")
+
+
+def allocate_geometry_buffer(n, dtype=np.float64):
+    """Function to allocate the output buffer of calculate_shot_geometry for n shots."""
+    return np.empty((len(GEOMETRY_FIELDS), n), dtype=dtype)
+
+
+def _bearing_into(out, sin_lat1, cos_lat1, lon1, sin_lat2, cos_lat2, lon2, d_lon, x):
+    """Function to write the bearing between two points into out, using the sin/cos of the latitudes."""
+    np.subtract(lon2, lon1, out=d_lon)
+    # x = cos(lat1) * sin(lat2) - sin(lat1) * cos(lat2) * cos(dLon)
+    np.multiply(sin_lat1, cos_lat2, out=x)
+    x *= np.cos(d_lon, out=out)
+    np.multiply(cos_lat1, sin_lat2, out=out)
+    np.subtract(out, x, out=x)
+    # y = sin(dLon) * cos(lat2)
+    np.sin(d_lon, out=d_lon)
+    d_lon *= cos_lat2
+    np.arctan2(d_lon, x, out=out)
+    np.rad2deg(out, out=out)
+    np.add(out, 360, out=out, where=out < 0)
+    return out
+
+
+def calculate_shot_geometry(start_lat, start_long, end_lat, end_long, pin_lat, pin_long,
+                            shot_distance, shot_start_distance_yards, shot_end_distance_yards,
+                            dtype=np.float64, out=None):
+    """
+    Function to calculate all the bearings, angles and miss distances of the shots in one pass.
+
+    Gives the same results as get_bearing, calculate_start_end_pin_angle and calculate_miss_distance, but each
+    coordinate is converted to radians once, the sin and cos of each latitude are computed once and the results
+    are written into one preallocated buffer instead of many temporary arrays.
+
+    Args:
+        start_lat, start_long: Float arrays with the start coordinates in degrees
+        end_lat, end_long: Float arrays with the end coordinates in degrees
+        pin_lat, pin_long: Float arrays with the pin coordinates in degrees
+        shot_distance: Float array with the shot distances in yards
+        shot_start_distance_yards: Float array with the distances to the pin before the shots
+        shot_end_distance_yards: Float array with the distances to the pin after the shots
+        dtype: np.float64, or np.float32 to halve the memory at the cost of precision. Most miss distances stay
+               within half a yard, but near 180° of miss bearing or 90° of start/end/pin angle float32 can take
+               the other left/right branch, so a few shots get a miss distance tens of yards off or of the other
+               sign
+        out: Buffer from allocate_geometry_buffer to reuse, a new one is allocated if None
+    Returns:
+        (dict) One array per name of GEOMETRY_FIELDS, all views of the buffer
+    """
+    start_lat, start_long, end_lat, end_long, pin_lat, pin_long = (
+        np.radians(np.asarray(values, dtype=dtype))
+        for values in (start_lat, start_long, end_lat, end_long, pin_lat, pin_long))
+    shot_distance, shot_start_distance_yards, shot_end_distance_yards = (
+        np.asarray(values, dtype=dtype)
+        for values in (shot_distance, shot_start_distance_yards, shot_end_distance_yards))
+    n = start_lat.shape[0]
+    if out is None:
+        out = allocate_geometry_buffer(n, dtype)
+    (start_to_end_bearing, start_to_pin_bearing, end_to_pin_bearing, miss_bearing_left_right,
+     start_end_pin_angle, distance_left_right, distance_short_long) = out
+
+    # Bearings, with the sin/cos of each latitude shared between them.
+    d_lon = np.empty(n, dtype=dtype)
+    x = np.empty(n, dtype=dtype)
+    sin_start, cos_start = np.sin(start_lat), np.cos(start_lat)
+    sin_end, cos_end = np.sin(end_lat), np.cos(end_lat)
+    sin_pin, cos_pin = np.sin(pin_lat), np.cos(pin_lat)
+    _bearing_into(start_to_end_bearing, sin_start, cos_start, start_long, sin_end, cos_end, end_long, d_lon, x)
+    _bearing_into(start_to_pin_bearing, sin_start, cos_start, start_long, sin_pin, cos_pin, pin_long, d_lon, x)
+    _bearing_into(end_to_pin_bearing, sin_end, cos_end, end_long, sin_pin, cos_pin, pin_long, d_lon, x)
+    np.subtract(start_to_end_bearing, start_to_pin_bearing, out=miss_bearing_left_right)
+    np.add(miss_bearing_left_right, 360, out=miss_bearing_left_right, where=miss_bearing_left_right < 0)
+
+    # Start/end/pin angle, only defined when both the shot and the end distance are positive.
+    valid = (shot_end_distance_yards > 0) & (shot_distance > 0)
+    np.square(shot_distance, out=x)
+    x += np.square(shot_end_distance_yards, out=d_lon)
+    x -= np.square(shot_start_distance_yards, out=d_lon)
+    np.multiply(2, shot_distance, out=d_lon)
+    d_lon *= shot_end_distance_yards
+    np.divide(x, d_lon, out=x, where=valid)
+    start_end_pin_angle.fill(0)
+    np.arccos(x, out=start_end_pin_angle, where=valid)
+    np.rad2deg(start_end_pin_angle, out=start_end_pin_angle)
+
+    # Miss distances. Both distances use alpha when the angle is obtuse and 180 - alpha otherwise.
+    left = miss_bearing_left_right > 180
+    obtuse = start_end_pin_angle > 90
+    np.subtract(360, miss_bearing_left_right, out=x)
+    np.subtract(180, x, out=x)
+    np.subtract(180, miss_bearing_left_right, out=x, where=~left)
+    x -= start_end_pin_angle
+    np.subtract(180, x, out=x, where=~obtuse)
+    np.radians(x, out=x)
+    np.sin(x, out=distance_left_right)
+    np.cos(x, out=distance_short_long)
+    # Same as calculate_miss_distance, which takes the cosine for acute angles missed to the right.
+    np.copyto(distance_left_right, distance_short_long, where=~obtuse & ~left)
+    distance_left_right *= shot_end_distance_yards
+    np.negative(distance_left_right, out=distance_left_right, where=left)
+    distance_short_long *= shot_end_distance_yards
+    np.negative(distance_short_long, out=distance_short_long, where=obtuse)
+
+    return dict(zip(GEOMETRY_FIELDS, out))
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Shots are compared with the other shots of the same player, of the same type and hit with the same club.
+ZSCORE_KEYS = ["round_userId", "shot_type", "shot_clubType"]
+ZSCORE_COLUMNS = ["shot_distance_yards_calculated", "shot_start_distance_yards"]
+
+
+def group_zscores(data, keys=ZSCORE_KEYS, columns=ZSCORE_COLUMNS):
+    """
+    Calculates the z-scores (ddof=1) of the columns within each group, in one grouped pass.
+
+    Gives the same results as groupby(keys)[column].transform(scipy.stats.zscore, ddof=1) for each column,
+    without calling scipy once per group: groups with a NaN, a single shot or no spread get NaN.
+
+    Args:
+        data: Dataframe containing shots data
+        keys: Columns identifying a group
+        columns: Columns to calculate the z-scores of
+    Returns:
+        (dataframe) z-scores with the same index as data and one column per column
+    """
+    grouped = data.groupby(keys)
+    mean = grouped[columns].transform("mean")
+    std = grouped[columns].transform("std")
+    count = grouped[columns].transform("count")
+    size = grouped[columns[0]].transform("size")
+    # scipy propagates NaNs to the whole group.
+    return ((data[columns] - mean) / std).where(count.eq(size, axis=0))
+
+
+class RunningShotStatistics(object):
+    """
+    Running count, mean and M2 of the shot distances of each group, updated as new rounds arrive.
+
+    Lets the shots of a new round be compared with the whole history of the player without reloading it.
+    Groups are merged with Chan's parallel algorithm, so each round must be added only once. Unlike
+    group_zscores, NaNs are skipped instead of making the whole group NaN.
+
+    Attributes:
+        keys: Columns identifying a group
+        columns: Columns with running statistics
+        statistics: Dataframe indexed by keys with the "count", "mean" and "m2" of each column, None if empty
+    """
+
+    def __init__(self, keys=ZSCORE_KEYS, columns=ZSCORE_COLUMNS, statistics=None):
+        self.keys = list(keys)
+        self.columns = list(columns)
+        self.statistics = statistics
+
+    @classmethod
+    def load(cls, path, keys=ZSCORE_KEYS, columns=ZSCORE_COLUMNS):
+        """Loads statistics saved with save."""
+        return cls(keys, columns, pd.read_pickle(path))
+
+    def save(self, path):
+        """Saves the statistics to a pickle file."""
+        self.statistics.to_pickle(path)
+
+    def update(self, data):
+        """
+        Adds the shots of data to the statistics of their groups.
+
+        Args:
+            data: Dataframe containing shots data, with the keys and columns
+        """
+        grouped = data.groupby(self.keys)[self.columns]
+        count = grouped.count()
+        mean = grouped.mean().fillna(0)
+        m2 = (grouped.var() * (count - 1)).fillna(0)
+        new = pd.concat({"count": count, "mean": mean, "m2": m2}, axis=1)
+        if self.statistics is None:
+            self.statistics = new
+            return
+
+        old, new = self.statistics.align(new, join="outer", fill_value=0)
+        old_count, new_count = old["count"], new["count"]
+        count = old_count + new_count
+        delta = new["mean"] - old["mean"]
+        # Share of the new shots in each group, 0 for the groups without any shot.
+        weight = (new_count / count).fillna(0)
+        mean = old["mean"] + delta * weight
+        m2 = old["m2"] + new["m2"] + delta ** 2 * old_count * weight
+        self.statistics = pd.concat({"count": count, "mean": mean, "m2": m2}, axis=1)
+
+    def zscores(self, data):
+        """
+        Calculates the z-scores (ddof=1) of the shots of data against the statistics of their groups.
+
+        Args:
+            data: Dataframe containing shots data, with the keys and columns
+        Returns:
+            (dataframe) z-scores with the same index as data and one column per column, NaN for unknown groups
+        """
+        if self.statistics is None:
+            return pd.DataFrame(np.nan, index=data.index, columns=self.columns)
+        aligned = self.statistics.reindex(pd.MultiIndex.from_frame(data[self.keys]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(aligned["m2"].values / (aligned["count"].values - 1))
+            zscores = (data[self.columns].values - aligned["mean"].values) / std
+        return pd.DataFrame(zscores, index=data.index, columns=self.columns)
@@ -1,4 +1,9 @@
 import numpy as np
+import pandas as pd
+
+# Lies with a benchmark. Shots in the hole are expected to take 0 shots, other lies are unknown.
+LIES = ("Tee", "Fairway", "Rough", "Sand", "Green")
+IN_THE_HOLE = "In The Hole"
 
 
 def expected_shots(x, lie, expected_shots_tee=None, expected_shots_fairway=None, expected_shots_rough=None, expected_shots_sand=None, expected_shots_green=None, **kwargs):
@@ -28,3 +33,106 @@ def strokes_gained_calculation(start_lie, start_distance, end_lie, end_distance,
         strokes_gained = (start_average_number_of_shots - end_average_number_of_shots
                           - (next_shot_number - shot_number))
     return strokes_gained
+
+
+def read_benchmark(benchmark_file, putting_benchmark_file):
+    """
+    Reads a benchmark from csv files in the format of PGA Benchmark.csv and PGA Putting Benchmark.csv.
+
+    Args:
+        benchmark_file: csv with a "Distance" column in yards and one column of expected shots per lie but Green
+        putting_benchmark_file: csv with a "Distance (feet)" column and an "Expected putts" column
+    Returns:
+        (dict) For each lie of LIES, the sorted distances in yards and the expected number of shots
+    """
+    tee_app_arg = pd.read_csv(benchmark_file)
+    put = pd.read_csv(putting_benchmark_file)
+    put["Distance"] = put["Distance (feet)"] / 3
+    tables = {lie: tee_app_arg[["Distance", lie]].dropna() for lie in LIES if lie != "Green"}
+    tables["Green"] = put[["Distance", "Expected putts"]].rename(columns={"Expected putts": "Green"})
+    benchmark = {}
+    for lie, table in tables.items():
+        table = table.sort_values("Distance", kind="stable")
+        benchmark[lie] = (table["Distance"].values.astype(np.float64), table[lie].values.astype(np.float64))
+    return benchmark
+
+
+class StrokesGainedBenchmarks(object):
+    """
+    Expected number of shots of several benchmarks, interpolated linearly on one shared distance grid per lie.
+
+    The lie of each shot is looked up and its distance placed in the grid once, then each benchmark only costs a
+    gather of its values. With a single benchmark, the results are the same as with interp1d. Distances outside
+    the grid raise a ValueError like interp1d, distances outside the range of one benchmark only give NaN for it.
+
+    Attributes:
+        names: Names of the benchmarks, in the order of the rows of the results
+        grids: For each lie, the sorted union of the distances of all the benchmarks
+        expected_shots_grid: For each lie, an array (benchmark, grid) of expected number of shots
+        slopes: For each lie, an array (benchmark, grid - 1) of the slope of each segment of the grid
+    """
+
+    def __init__(self, benchmarks):
+        """
+        Args:
+            benchmarks: Dict of benchmark name -> benchmark, as returned by read_benchmark
+        """
+        self.names = list(benchmarks)
+        self.grids = {}
+        self.expected_shots_grid = {}
+        self.slopes = {}
+        for lie in LIES:
+            grid = np.unique(np.concatenate([benchmarks[name][lie][0] for name in self.names]))
+            # The grid holds every distance of each benchmark, so np.interp returns their values unchanged.
+            expected = np.vstack([np.interp(grid, *benchmarks[name][lie], left=np.nan, right=np.nan)
+                                  for name in self.names])
+            self.grids[lie] = grid
+            self.expected_shots_grid[lie] = expected
+            self.slopes[lie] = np.diff(expected, axis=1) / np.diff(grid)
+
+    def expected_shots(self, lies, distances):
+        """
+        Calculates the expected number of shots from each lie and distance, for every benchmark.
+
+        Args:
+            lies: Array of Clippd lie names
+            distances: Float array of distances to the pin in yards
+        Returns:
+            (array) Expected number of shots of shape (benchmark, shot)
+        """
+        distances = np.asarray(distances, dtype=np.float64)
+        codes = pd.Categorical(lies, categories=LIES + (IN_THE_HOLE,)).codes
+        expected = np.full((len(self.names), len(distances)), np.nan)
+        expected[:, codes == len(LIES)] = 0
+        for code, lie in enumerate(LIES):
+            shots = np.flatnonzero(codes == code)
+            if not len(shots):
+                continue
+            x = distances[shots]
+            grid = self.grids[lie]
+            if (x < grid[0]).any():
+                raise ValueError("A value ({}) in x_new is below the interpolation range's minimum value ({})."
+                                 .format(x[np.argmax(x < grid[0])], grid[0]))
+            if (x > grid[-1]).any():
+                raise ValueError("A value ({}) in x_new is above the interpolation range's maximum value ({})."
+                                 .format(x[np.argmax(x > grid[-1])], grid[-1]))
+            # Same segments as interp1d: the value of a distance equal to a grid point comes from the segment below.
+            lo = np.searchsorted(grid, x).clip(1, len(grid) - 1) - 1
+            offset = x - grid[lo]
+            expected[:, shots] = self.slopes[lie][:, lo] * offset + self.expected_shots_grid[lie][:, lo]
+        return expected
+
+    def strokes_gained(self, start_lies, start_distances, end_lies, end_distances, shot_numbers, next_shot_numbers):
+        """
+        Calculates the strokes gained of each shot against every benchmark, like strokes_gained_calculation.
+
+        Returns:
+            (array) Strokes gained of shape (benchmark, shot)
+        """
+        start = self.expected_shots(start_lies, start_distances)
+        end = self.expected_shots(end_lies, end_distances)
+        shot_numbers = np.asarray(shot_numbers, dtype=np.float64)
+        next_shot_numbers = np.asarray(next_shot_numbers, dtype=np.float64)
+        # In strokes_gained_calculation, NaN next shot numbers are truthy so only 0 uses the other formula.
+        shots_taken = np.where(next_shot_numbers == 0, next_shot_numbers - shot_numbers, 1)
+        return start - end - shots_taken
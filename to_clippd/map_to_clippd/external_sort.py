@@ -0,0 +1,203 @@
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Order of a Clippd Dataframe.
+SORT_KEY = ["data_source", "player_id", "round_time", "round_id", "hole_id"]
+
+# Default number of bytes of rows kept in memory.
+MEMORY_LIMIT = 256 * 2 ** 20
+
+
+class ExternalSort(object):
+    """
+    Sorts dataframes too large for the memory, by spilling sorted runs to disk and merging them.
+
+    Frames are buffered until they use memory_limit bytes, then the buffer is sorted and written to disk as a run,
+    in blocks of rows. merge reads the runs back one block at a time and merges fan_in of them at once (more runs
+    are first merged into larger runs), so about memory_limit bytes of rows are in memory while merging too.
+    Runs are pickled dataframe blocks, which keep pandas' columnar layout and dtypes (categorical, tz-aware
+    datetimes) without another dependency.
+
+    Rows with the same key keep the order in which they were added, like sort_values on the concatenated frames.
+
+    Attributes:
+        by: Columns to sort by
+        memory_limit: Bytes of rows kept in memory
+        fan_in: Maximum number of runs merged at once
+        directory: Directory of the runs, a temporary directory removed after merge by default
+        runs: Paths of the runs written to disk
+    """
+
+    def __init__(self, by=SORT_KEY, memory_limit=MEMORY_LIMIT, fan_in=16, directory=None):
+        self.by = list(by)
+        self.memory_limit = memory_limit
+        self.fan_in = fan_in
+        self._temporary = directory is None
+        self.directory = tempfile.mkdtemp(prefix="external_sort_") if directory is None else directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.runs = []
+        self._written = 0
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    def __sort(self, data):
+        # Stable, so rows with the same key keep their order.
+        return data.sort_values(by=self.by, kind="stable")
+
+    def add(self, frame):
+        """Adds a frame to sort, spilling the buffered frames to disk when they use more than memory_limit."""
+        if frame is None or frame.empty:
+            return
+        self._buffer.append(frame)
+        self._buffer_bytes += frame.memory_usage(index=True, deep=True).sum()
+        if self._buffer_bytes >= self.memory_limit:
+            self.spill()
+
+    def spill(self):
+        """Sorts the buffered frames and writes them to disk as a run."""
+        if not self._buffer:
+            return
+        data = self.__sort(pd.concat(self._buffer))
+        row_bytes = self._buffer_bytes / len(data)
+        self._buffer = []
+        self._buffer_bytes = 0
+        # One block of each merged run, plus the rows being emitted, must fit in memory_limit.
+        block_rows = max(1, int(self.memory_limit / (self.fan_in + 1) / row_bytes))
+        self.runs.append(self.__write_run(data.iloc[start:start + block_rows]
+                                          for start in range(0, len(data), block_rows)))
+
+    def __write_run(self, blocks):
+        path = os.path.join(self.directory, "run_{:05d}.pkl".format(self._written))
+        self._written += 1
+        with open(path, "wb") as f:
+            for block in blocks:
+                if len(block):
+                    pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    @staticmethod
+    def __read_run(path):
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def __comparable(self, frame):
+        """Arrays of the key columns of frame, whose values compare like sort_values orders them."""
+        keys = []
+        for column in self.by:
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes = values.cat.codes.values
+                keys.append(np.where(codes >= 0, codes, np.nan))
+            else:
+                # Tz-aware datetimes become UTC datetime64, in the same order.
+                keys.append(values.values)
+        return keys
+
+    @staticmethod
+    def __count_before(keys, key):
+        """Number of rows of sorted keys that come before key in the order of sort_values (missing values last)."""
+        before = np.zeros(len(keys[0]), dtype=bool)
+        equal = np.ones(len(keys[0]), dtype=bool)
+        for values, value in zip(keys, key):
+            present = ~pd.isna(values)
+            if pd.isna(value):
+                before |= equal & present
+                equal &= ~present
+            else:
+                less = np.zeros(len(values), dtype=bool)
+                same = np.zeros(len(values), dtype=bool)
+                less[present] = values[present] < value
+                same[present] = values[present] == value
+                before |= equal & less
+                equal &= same
+        # The keys are sorted, so the rows before key are a prefix.
+        return int(before.sum())
+
+    def __merge_runs(self, paths):
+        """
+        Merges sorted runs, yielding the sorted rows one part at a time.
+
+        The run whose buffered rows end with the smallest key is the frontier: no row still on disk can come
+        before its last key, so the buffered rows of every run with a smaller key are emitted, then the next block
+        of the frontier is read. Only the emitted rows are sorted.
+        """
+        readers = [self.__read_run(path) for path in paths]
+        pending = [next(reader) for reader in readers]
+        keys = [self.__comparable(frame) for frame in pending]
+        exhausted = [False] * len(readers)
+        while True:
+            live = [i for i in range(len(readers)) if not exhausted[i]]
+            if not live:
+                data = pd.concat(pending)
+                if len(data):
+                    yield self.__sort(data)
+                return
+
+            last_keys = pd.concat([pending[i][self.by].iloc[-1:] for i in live], ignore_index=True)
+            frontier = live[self.__sort(last_keys).index[0]]
+            frontier_key = [values[-1] for values in keys[frontier]]
+
+            counts = [self.__count_before(run_keys, frontier_key) for run_keys in keys]
+            if any(counts):
+                yield self.__sort(pd.concat([frame.iloc[:count] for frame, count in zip(pending, counts) if count]))
+                pending = [frame.iloc[count:] for frame, count in zip(pending, counts)]
+                keys = [[values[count:] for values in run_keys] for run_keys, count in zip(keys, counts)]
+
+            block = next(readers[frontier], None)
+            if block is None:
+                exhausted[frontier] = True
+            else:
+                pending[frontier] = pd.concat([pending[frontier], block])
+                keys[frontier] = [np.concatenate([values, new]) for values, new in
+                                  zip(keys[frontier], self.__comparable(block))]
+
+    def merge(self):
+        """
+        Merges the runs and the buffered frames.
+
+        Returns:
+            (generator) Sorted parts of the rows, with a RangeIndex continuing from one part to the next
+        """
+        try:
+            if self.runs:
+                self.spill()
+                # Consecutive runs are merged together, so rows with the same key stay in order.
+                while len(self.runs) > self.fan_in:
+                    runs, self.runs = self.runs, []
+                    for start in range(0, len(runs), self.fan_in):
+                        self.runs.append(self.__write_run(self.__merge_runs(runs[start:start + self.fan_in])))
+                        for path in runs[start:start + self.fan_in]:
+                            os.remove(path)
+                parts = self.__merge_runs(self.runs)
+            elif self._buffer:
+                # Everything fits in memory.
+                parts = [self.__sort(pd.concat(self._buffer))]
+                self._buffer = []
+            else:
+                parts = []
+
+            start = 0
+            for part in parts:
+                part.index = pd.RangeIndex(start, start + len(part))
+                start += len(part)
+                yield part
+        finally:
+            self.close()
+
+    def close(self):
+        """Removes the runs from disk."""
+        for path in self.runs:
+            if os.path.exists(path):
+                os.remove(path)
+        self.runs = []
+        if self._temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -3,6 +3,10 @@ import os
 import pandas as pd
 import pytz
 
+from to_clippd.map_to_clippd.external_sort import ExternalSort
+from to_clippd.map_to_clippd.external_sort import MEMORY_LIMIT
+from to_clippd.map_to_clippd.external_sort import SORT_KEY
+
 # get the location of this script so we can read in local files
 # otherwise we have problems were we can"t find the files
 # as python will look in cwd instead of this directory
@@ -19,10 +23,17 @@ class MapToClippd(object):
     Takes a dataframe from an external source and map it to a clippd Dataframe
 
     Attributes:
-        data_dictionary: Mapping between the name of the columns in Clippd and arccos
+        data_dictionary: Mapping between the name of the columns in Clippd and arccos, read on first use
     """
     def __init__(self):
-        self.data_dictionary = pd.read_excel(os.path.join(__location__, "data_dictionary.xlsx"))
+        self._data_dictionary = None
+
+    @property
+    def data_dictionary(self):
+        """Reads the data dictionary the first time it is needed, reading xlsx files imports openpyxl."""
+        if self._data_dictionary is None:
+            self._data_dictionary = pd.read_excel(os.path.join(__location__, "data_dictionary.xlsx"))
+        return self._data_dictionary
 
     @staticmethod
     def __standardize_values(clippd_data):
@@ -66,6 +77,12 @@ class MapToClippd(object):
             arccos_data_dictionary = self.data_dictionary[["Clippd", "Arccos"]]
             arccos_data_dictionary = arccos_data_dictionary.dropna().set_index("Arccos").to_dict()["Clippd"]
 
+            # Keep the strokes gained against the additional benchmarks of DeriveInsights.
+            for column in data.columns:
+                if column.startswith("strokes_gained_calculated_"):
+                    benchmark = column[len("strokes_gained_calculated_"):]
+                    arccos_data_dictionary[column] = "shot_strokes_gained_" + benchmark
+
             # Filter relevant columns, apply data dictionary and add data_source field.
             filtered_columns = list(arccos_data_dictionary.keys())
             filtered_columns.remove("'arccos'")
@@ -87,3 +104,24 @@ class MapToClippd(object):
             return self.__standardize_values(clippd_data)
         else:
             return None
+
+    def process_chunks(self, source, chunks, memory_limit=MEMORY_LIMIT, directory=None):
+        """
+        Maps chunks of data one at a time and sorts them out of core, for batches too large for the memory.
+
+        Each chunk is mapped and sorted on its own, and the chunks are spilled to disk as sorted runs once they use
+        memory_limit bytes, then merged. The rows come in the order of process on all the chunks concatenated
+        (shot_id breaks the ties of the sort key, like the first sort of process does), with a new RangeIndex.
+
+        Args:
+            source: source of the external data
+            chunks: Iterable of Dataframes containing the data from an external source, None are skipped
+            memory_limit: Bytes of mapped rows kept in memory
+            directory: Directory of the sorted runs, a temporary directory by default
+        Returns:
+            (generator) Sorted parts of the Clippd Dataframe
+        """
+        external_sort = ExternalSort(by=SORT_KEY + ["shot_id"], memory_limit=memory_limit, directory=directory)
+        for data in chunks:
+            external_sort.add(self.process(source, data))
+        return external_sort.merge()
@@ -0,0 +1,180 @@
+import multiprocessing
+import queue
+import threading
+import time
+
+from to_clippd.pipeline.shared_frame import release
+from to_clippd.pipeline.shared_frame import share
+from to_clippd.pipeline.shared_frame import unshare
+
+
+# Seconds the consumer waits for an output before checking that the process stages are still alive.
+LIVENESS_TIMEOUT = 1.0
+
+
+class _EndOfStream(object):
+    """Put in the queues after the last item. Compared by type, as it is copied between processes."""
+
+
+def _qsize(stage_queue):
+    """Returns the number of items in the queue, 0 where multiprocessing can't tell (macOS)."""
+    try:
+        return stage_queue.qsize()
+    except NotImplementedError:
+        return 0
+
+
+def _run_stage(name, function, in_queue, out_queue, report_queue, share_output=False):
+    """
+    Applies function to each item of in_queue and puts the results in out_queue, until the end of the stream.
+
+    An item that can't be processed gives None, like the tools do when they can't process their input, so one bad
+    chunk doesn't stop the stream. Sends the statistics of the stage to report_queue at the end. Dataframes
+    received as SharedFrame are rebuilt, and if share_output is True the dataframes are sent as SharedFrame.
+    """
+    start = time.perf_counter()
+    busy = 0.0
+    items = 0
+    depth_sum = 0
+    depth_max = 0
+    while True:
+        depth = _qsize(in_queue)
+        item = in_queue.get()
+        if isinstance(item, _EndOfStream):
+            break
+        depth_sum += depth
+        depth_max = max(depth_max, depth)
+        function_start = time.perf_counter()
+        try:
+            result = function(unshare(item))
+            if share_output:
+                result = share(result)
+        except Exception as e:
+            print("Can't process chunk in stage " + name, e)
+            result = None
+        busy += time.perf_counter() - function_start
+        items += 1
+        out_queue.put(result)
+    out_queue.put(item)
+    wall = time.perf_counter() - start
+    report_queue.put({"stage": name,
+                      "items": items,
+                      "busy_seconds": busy,
+                      "wall_seconds": wall,
+                      "utilization": busy / wall if wall else 0.0,
+                      "mean_queue_depth": depth_sum / items if items else 0.0,
+                      "max_queue_depth": depth_max})
+
+
+class Pipeline(object):
+    """
+    Runs stages concurrently, each in its own worker, connected by bounded queues.
+
+    Each stage takes the items of the previous stage one by one, so a stage starts on a chunk as soon as the
+    previous one is done with it. When a queue is full, the stage before it waits: the stages can't get more than
+    queue_size chunks ahead of each other. Each stage has a single worker, so the chunks stay in order.
+
+    Attributes:
+        stages: List of (name, function, kind). kind is "thread" for I/O bound stages or "process" for CPU bound
+                stages. The functions of process stages, and their inputs and outputs, must be picklable
+        queue_size: Maximum number of chunks waiting in each queue
+        shared_memory: If True, dataframes going to or from a process stage are sent through shared memory (see
+                       SharedFrame) instead of being pickled
+        report: After a run, one dict per stage with its number of items, busy and wall time, utilization
+                (busy / wall) and the mean and max depth of its input queue
+    """
+
+    def __init__(self, stages, queue_size=2, shared_memory=True):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.shared_memory = shared_memory
+        self.report = None
+
+    def __make_queue(self, maxsize=0):
+        """Threads can share simple queues, as soon as one stage is a process all queues must be multiprocessing."""
+        if any(kind == "process" for _, _, kind in self.stages):
+            return multiprocessing.Queue(maxsize)
+        return queue.Queue(maxsize)
+
+    @staticmethod
+    def __feed(items, first_queue):
+        """Puts the items in the first queue, followed by the end of the stream."""
+        for item in items:
+            first_queue.put(item)
+        first_queue.put(_EndOfStream())
+
+    def run(self, items):
+        """
+        Runs every item through the stages.
+
+        Args:
+            items: Iterable of inputs of the first stage
+        Yields:
+            The output of the last stage for each item, in order. Raises RuntimeError if a process stage dies, as
+            its items would never come out
+        """
+        queues = [self.__make_queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        report_queue = self.__make_queue()
+        # The output of a stage leaves its process if the stage or the next one is a process.
+        kinds = [kind for _, _, kind in self.stages] + ["thread"]
+        workers = []
+        for i, ((name, function, kind), in_queue, out_queue) in enumerate(zip(self.stages, queues, queues[1:])):
+            share_output = self.shared_memory and "process" in (kind, kinds[i + 1])
+            worker_class = multiprocessing.Process if kind == "process" else threading.Thread
+            worker = worker_class(target=_run_stage,
+                                  args=(name, function, in_queue, out_queue, report_queue, share_output),
+                                  name=name, daemon=True)
+            workers.append(worker)
+        processes = [worker for worker in workers if isinstance(worker, multiprocessing.Process)]
+        # The processes are forked before any thread is started, so none of them holds a copy of a lock taken by a
+        # thread at the time of the fork.
+        for worker in processes + [worker for worker in workers if worker not in processes]:
+            worker.start()
+        threading.Thread(target=self.__feed, args=(items, queues[0]), daemon=True).start()
+
+        finished = False
+        try:
+            while True:
+                try:
+                    item = queues[-1].get(timeout=LIVENESS_TIMEOUT)
+                except queue.Empty:
+                    # A stage ends with exit code 0, any other code means it died (killed, os._exit, segfault).
+                    for worker in processes:
+                        if worker.exitcode not in (None, 0):
+                            raise RuntimeError("Stage {} died with exit code {}".format(worker.name, worker.exitcode))
+                    continue
+                if isinstance(item, _EndOfStream):
+                    break
+                yield unshare(item)
+            finished = True
+        finally:
+            if finished:
+                # Read the reports before joining, a process doesn't exit until its queues are flushed.
+                reports = {}
+                for _ in self.stages:
+                    report = report_queue.get()
+                    reports[report["stage"]] = report
+                for (name, _, kind), worker in zip(self.stages, workers):
+                    worker.join()
+                    reports[name]["kind"] = kind
+                self.report = [reports[name] for name, _, _ in self.stages]
+            else:
+                # The consumer stopped early or a stage died, the others may be waiting on full queues.
+                for worker in processes:
+                    worker.terminate()
+                # Free the shared memory of the chunks left in the queues.
+                for stage_queue in queues:
+                    try:
+                        while True:
+                            release(stage_queue.get(timeout=0.1))
+                    except queue.Empty:
+                        pass
+
+    def format_report(self):
+        """Returns the report of the last run as a table."""
+        lines = ["{:<12} {:<8} {:>6} {:>10} {:>10} {:>12} {:>10} {:>10}".format(
+            "stage", "kind", "items", "busy (s)", "wall (s)", "utilization", "mean queue", "max queue")]
+        for report in self.report or []:
+            lines.append("{stage:<12} {kind:<8} {items:>6} {busy_seconds:>10.3f} {wall_seconds:>10.3f} "
+                         "{utilization:>12.1%} {mean_queue_depth:>10.2f} {max_queue_depth:>10}".format(**report))
+        return "\n".join(lines)
@@ -0,0 +1,160 @@
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+# Offsets of the arrays in the shared memory are multiples of this, to keep them aligned.
+_ALIGNMENT = 64
+
+
+def _na_value(values):
+    """Returns the missing value used by all the NAs of an object array, raises ValueError if they differ."""
+    missing = values[pd.isna(values)]
+    if all(value is None for value in missing):
+        return None
+    if all(isinstance(value, float) and np.isnan(value) for value in missing):
+        return np.nan
+    raise ValueError("Mixed missing values")
+
+
+def _encode(series):
+    """
+    Splits a column into arrays to put in the shared memory and the metadata to rebuild it.
+
+    Returns:
+        (tuple) kind, metadata, list of arrays. Columns that can't be encoded are pickled whole in the metadata.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "categorical", (dtype.categories, dtype.ordered), [series.cat.codes.values]
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return "datetimetz", (dtype.unit, dtype.tz), [series.array.asi8]
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        return "numpy", dtype, [series.values]
+    if dtype == object and infer_dtype(series, skipna=True) in ("string", "integer", "empty"):
+        try:
+            na_value = _na_value(series.values)
+        except ValueError:
+            return "pickle", series.values, []
+        codes, uniques = pd.factorize(series.values)
+        return "factorized", (np.asarray(uniques, dtype=object), na_value), [codes]
+    return "pickle", series.values, []
+
+
+def _decode(kind, metadata, arrays):
+    """Rebuilds a column from what _encode returned, the arrays being copies that the column can own."""
+    if kind == "categorical":
+        categories, ordered = metadata
+        return pd.Categorical.from_codes(arrays[0], categories=categories, ordered=ordered)
+    if kind == "datetimetz":
+        unit, tz = metadata
+        return pd.DatetimeIndex(arrays[0].view("M8[" + unit + "]")).tz_localize("UTC").tz_convert(tz)
+    if kind == "numpy":
+        return arrays[0]
+    if kind == "factorized":
+        uniques, na_value = metadata
+        codes = arrays[0]
+        values = uniques.take(codes) if len(uniques) else np.empty(len(codes), dtype=object)
+        values[codes == -1] = na_value
+        return values
+    return metadata
+
+
+class SharedFrame(object):
+    """
+    Handle of a dataframe whose numeric columns are in shared memory, to send it to another process.
+
+    Numeric, boolean and datetime columns are written once into one shared memory block, and string columns are
+    sent as integer codes in it, so only their dictionaries, the column names and the small metadata are
+    pickled. Columns that can't be encoded (tuples, mixed types) are pickled as usual. This saves the pickling
+    and the transfer through a pipe, not the copies: the columns are copied into the block, and to_frame copies
+    them out of it before freeing it.
+
+    The block is freed by to_frame or release, each handle must be used once. It is not left to the resource
+    tracker of the creating process, which would unlink it when that process exits, while the handle may still
+    be waiting in a queue for the next stage.
+
+    Attributes:
+        name: Name of the shared memory block, None if the frame has no arrays
+        length: Number of rows
+        columns: Column labels
+        index: Index metadata, encoded like a column
+        index_name: Name of the index
+        encoded: For each column, its kind, metadata and the (offset, dtype, shape) of its arrays in the block
+    """
+
+    def __init__(self, frame):
+        self.length = len(frame)
+        self.columns = frame.columns
+        # A RangeIndex is only metadata, and a MultiIndex is rare enough to be pickled.
+        if isinstance(frame.index, (pd.RangeIndex, pd.MultiIndex)):
+            index = ("pickle", frame.index, [])
+        else:
+            index = _encode(pd.Series(frame.index))
+        self.index_name = frame.index.name
+        parts = [index] + [_encode(frame.iloc[:, i]) for i in range(frame.shape[1])]
+
+        size = 0
+        layout = []
+        for _, _, arrays in parts:
+            positions = []
+            for array in arrays:
+                positions.append((size, array.dtype, array.shape))
+                size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+            layout.append(positions)
+
+        self.name = None
+        if size:
+            block = shared_memory.SharedMemory(create=True, size=size)
+            resource_tracker.unregister(block._name, "shared_memory")
+            self.name = block.name
+            for (_, _, arrays), positions in zip(parts, layout):
+                for array, (offset, dtype, shape) in zip(arrays, positions):
+                    np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)[...] = array
+            block.close()
+        encoded = [(kind, metadata, positions) for (kind, metadata, _), positions in zip(parts, layout)]
+        self.index = encoded[0]
+        self.encoded = encoded[1:]
+
+    def to_frame(self):
+        """Rebuilds the dataframe in this process and frees the shared memory."""
+        block = shared_memory.SharedMemory(name=self.name) if self.name else None
+        try:
+            decoded = []
+            for kind, metadata, positions in [self.index] + self.encoded:
+                arrays = [np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset).copy()
+                          for offset, dtype, shape in positions]
+                decoded.append(_decode(kind, metadata, arrays))
+        finally:
+            if block is not None:
+                block.close()
+                block.unlink()
+        frame = pd.DataFrame({i: column for i, column in enumerate(decoded[1:])}, index=pd.RangeIndex(self.length))
+        frame.columns = self.columns
+        frame.index = decoded[0] if self.index[0] == "pickle" else pd.Index(decoded[0], name=self.index_name)
+        return frame
+
+    def release(self):
+        """Frees the shared memory without rebuilding the dataframe."""
+        if self.name:
+            block = shared_memory.SharedMemory(name=self.name)
+            block.close()
+            block.unlink()
+
+
+def share(item):
+    """Returns a SharedFrame of item if it is a dataframe, else item."""
+    return SharedFrame(item) if isinstance(item, pd.DataFrame) else item
+
+
+def unshare(item):
+    """Returns the dataframe of item if it is a SharedFrame, else item."""
+    return item.to_frame() if isinstance(item, SharedFrame) else item
+
+
+def release(item):
+    """Frees the shared memory of item if it is a SharedFrame."""
+    if isinstance(item, SharedFrame):
+        item.release()
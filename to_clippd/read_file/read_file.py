@@ -1,13 +1,22 @@
 import json
 from os.path import exists
 
+from to_clippd.read_file.schema import validate_course
+from to_clippd.read_file.schema import validate_round
+from to_clippd.read_file.schema import validate_terrain
+
 
 class ReadFile(object):
     """
     Reads the json files coming from external sources and store the data as private variables.
 
     At the moment the class can only ready files from the source "arccos". If the files can"t be read,
-    the class will be returned with private variables equal to None.
+    the class will be returned with private variables equal to None. The rounds and terrain files contain one
+    round or a list of rounds.
+
+    With validate, the documents are checked against the schemas of read_file.schema before any dataframe is
+    built. An invalid round or terrain document only removes its round (from both rounds_data and terrain_data),
+    an invalid course document sets course_info to None, and the problems are kept in errors.
 
     Attributes:
         source: Name of the external source
@@ -17,9 +26,14 @@ class ReadFile(object):
         rounds_data: Array with the rounds data
         terrain_data: Array with the terrain data
         course_info: Dict with course data
+        validate: If True, the documents are validated after being read
+        errors: List of dicts with the "file", "index" of the document in it, "roundId" and the "errors" of each
+                invalid document. A file that is missing or can't be decoded is recorded with index and roundId
+                None, with or without validate
+        quarantined_rounds: roundIds of the rounds removed because a document was invalid
     """
 
-    def __init__(self, source, rounds_file, terrain_file, course_file):
+    def __init__(self, source, rounds_file, terrain_file, course_file, validate=False):
         """Inits ReadFile"""
         self.source = source
         self.rounds_file = rounds_file
@@ -28,26 +42,91 @@ class ReadFile(object):
         self.rounds_data = None
         self.terrain_data = None
         self.course_info = None
+        self.validate = validate
+        self.errors = []
+        self.quarantined_rounds = []
 
     def load_data(self):
         """Reads the 3 files and store the data as private variables"""
         # In case loading changes with different platforms
         # Check if all the files exist
-        files_exists = all([exists(self.rounds_file), exists(self.terrain_file), exists(self.course_file)])
-        if not files_exists:
+        missing = [file for file in (self.rounds_file, self.terrain_file, self.course_file) if not exists(file)]
+        if missing:
             print("Not all the files exist.")
+            for file in missing:
+                self.__add_file_error(file, "file not found")
         else:
             # In case the loading changes with different sources
             if self.source == "arccos":
+                file = self.rounds_file
                 try:
-                    with open(self.rounds_file) as f:
-                        self.rounds_data = [json.load(f)]
-                    with open(self.terrain_file) as f:
-                        self.terrain_data = [json.load(f)]
-                    with open(self.course_file) as f:
+                    with open(file) as f:
+                        self.rounds_data = self.__as_list(json.load(f))
+                    file = self.terrain_file
+                    with open(file) as f:
+                        self.terrain_data = self.__as_list(json.load(f))
+                    file = self.course_file
+                    with open(file) as f:
                         self.course_info = json.load(f)
                 # if the files are not json
-                except json.JSONDecodeError:
+                except json.JSONDecodeError as e:
                     print("Can't read file, bad format.")
+                    self.__add_file_error(file, "bad format: {}".format(e))
                 except Exception as e:
                     print("Can't read file", e)
+                    self.__add_file_error(file, str(e))
+                else:
+                    if self.validate:
+                        self.__validate()
+
+    def __add_file_error(self, file, error):
+        """Records a file that can't be read, its data is left to None."""
+        self.rounds_data = None
+        self.terrain_data = None
+        self.course_info = None
+        self.errors.append({"file": file, "index": None, "roundId": None, "errors": [error]})
+
+    @staticmethod
+    def __as_list(document):
+        return document if isinstance(document, list) else [document]
+
+    @staticmethod
+    def __round_id(document):
+        round_id = document.get("roundId") if isinstance(document, dict) else None
+        return round_id if isinstance(round_id, (int, float, str)) else None
+
+    def __check(self, file, documents, validate_document):
+        """Validates each document, records the errors and returns the indexes and roundIds of the invalid ones."""
+        indexes = set()
+        round_ids = set()
+        for index, document in enumerate(documents):
+            errors = validate_document(document)
+            if errors:
+                round_id = self.__round_id(document)
+                self.errors.append({"file": file, "index": index, "roundId": round_id, "errors": errors})
+                indexes.add(index)
+                if round_id is not None:
+                    round_ids.add(round_id)
+        return indexes, round_ids
+
+    def __validate(self):
+        """Removes the rounds with an invalid rounds or terrain document, and the course info if it is invalid."""
+        errors = validate_course(self.course_info)
+        if errors:
+            self.errors.append({"file": self.course_file, "index": 0, "roundId": None, "errors": errors})
+            self.course_info = None
+
+        invalid_rounds, rounds_ids = self.__check(self.rounds_file, self.rounds_data, validate_round)
+        invalid_terrain, terrain_ids = self.__check(self.terrain_file, self.terrain_data, validate_terrain)
+        if not invalid_rounds and not invalid_terrain:
+            return
+        # A round is removed from both files, whichever of its documents is invalid.
+        quarantined = rounds_ids | terrain_ids
+        self.rounds_data = [document for index, document in enumerate(self.rounds_data)
+                            if index not in invalid_rounds and self.__round_id(document) not in quarantined]
+        self.terrain_data = [document for index, document in enumerate(self.terrain_data)
+                             if index not in invalid_terrain and self.__round_id(document) not in quarantined]
+        self.quarantined_rounds = sorted(quarantined, key=str)
+        if not self.rounds_data or not self.terrain_data:
+            self.rounds_data = None
+            self.terrain_data = None
@@ -0,0 +1,253 @@
+import re
+
+# Values that pd.to_numeric and pd.to_datetime accept, checked before any dataframe is built.
+_NUMBER = re.compile(r"^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$")
+_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[-+]\d{2}:?\d{2})?$")
+
+# Number of errors after which the validation of a document stops.
+MAX_ERRORS = 20
+
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, (int, float)) or (isinstance(value, str) and _NUMBER.match(value) is not None)
+
+
+def _is_string(value):
+    return isinstance(value, str)
+
+
+def _is_timestamp(value):
+    return isinstance(value, str) and _TIMESTAMP.match(value) is not None
+
+
+def _is_boolean(value):
+    # The values AggregateData.boolean_map turns into booleans ("None" into null).
+    if isinstance(value, bool):
+        return True
+    if isinstance(value, str):
+        return value in ("T", "F", "None")
+    return isinstance(value, (int, float)) and value in (0, 1)
+
+
+_SCALARS = {"number": _is_number, "string": _is_string, "timestamp": _is_timestamp, "boolean": _is_boolean}
+
+
+class Field(object):
+    """
+    Expected field of a document.
+
+    Attributes:
+        kind: "number", "string", "timestamp", "boolean", a dict of Field or a ListOf
+        required: If True, the field must be present
+        nullable: If True, the field can be null
+    """
+
+    def __init__(self, kind, required=True, nullable=False):
+        self.kind = kind
+        self.required = required
+        self.nullable = nullable
+
+
+class ListOf(object):
+    """
+    Expected list of documents.
+
+    Attributes:
+        schema: dict of Field of each document
+        min_length: Minimum number of documents
+        same_keys: If True, every document must have the keys of the first one (json_normalize takes the keys of
+                   the first document for all of them)
+    """
+
+    def __init__(self, schema, min_length=0, same_keys=False):
+        self.schema = schema
+        self.min_length = min_length
+        self.same_keys = same_keys
+
+
+def _format(path):
+    return "".join("[{}]".format(part) if isinstance(part, int) else "." + part for part in path).lstrip(".")
+
+
+def _compile_document(kind):
+    """Compiles a dict of Field into a function checking a document."""
+    fields = [(name, field.required, field.nullable, compile_schema(field.kind),
+               _SCALARS.get(field.kind) if isinstance(field.kind, str) else None, field.kind)
+              for name, field in kind.items()]
+
+    def check_document(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append("{}: expected an object".format(_format(path) or "document"))
+            return
+        for name, required, nullable, check, is_valid, scalar in fields:
+            if len(errors) >= MAX_ERRORS:
+                return
+            if name not in value:
+                if required:
+                    errors.append("{}: missing".format(_format(path + (name,))))
+                continue
+            item = value[name]
+            if item is None:
+                if not nullable:
+                    errors.append("{}: null".format(_format(path + (name,))))
+            elif is_valid is not None:
+                # Scalars are checked here, without building their path unless they are invalid.
+                if not is_valid(item):
+                    errors.append("{}: expected a {}, got {!r}".format(_format(path + (name,)), scalar, item))
+            else:
+                check(item, path + (name,), errors)
+    return check_document
+
+
+def _compile_list(kind):
+    """Compiles a ListOf into a function checking a list of documents."""
+    check_item = compile_schema(kind.schema)
+    min_length = kind.min_length
+    same_keys = kind.same_keys
+
+    def check_list(value, path, errors):
+        if not isinstance(value, list):
+            errors.append("{}: expected a list".format(_format(path)))
+            return
+        if len(value) < min_length:
+            errors.append("{}: expected at least {} items".format(_format(path), min_length))
+            return
+        first_keys = value[0].keys() if same_keys and isinstance(value[0], dict) else None
+        for i, item in enumerate(value):
+            if len(errors) >= MAX_ERRORS:
+                return
+            check_item(item, path + (i,), errors)
+            if first_keys is not None and isinstance(item, dict) and item.keys() != first_keys:
+                errors.append("{}: keys differ from the first item".format(_format(path + (i,))))
+    return check_list
+
+
+def _compile_scalar(kind):
+    """Compiles "number", "string", "timestamp" or "boolean" into a function checking a value."""
+    is_valid = _SCALARS[kind]
+
+    def check_scalar(value, path, errors):
+        if not is_valid(value):
+            errors.append("{}: expected a {}, got {!r}".format(_format(path), kind, value))
+    return check_scalar
+
+
+def compile_schema(kind):
+    """
+    Turns a schema into a function checking a value, so the schema is only walked once.
+
+    The function takes (value, path, errors) and appends to errors a message for each problem, the path of the
+    value being a tuple of keys and indexes. Messages are only formatted when there is an error.
+    """
+    if isinstance(kind, dict):
+        return _compile_document(kind)
+    if isinstance(kind, ListOf):
+        return _compile_list(kind)
+    return _compile_scalar(kind)
+
+
+# Fields read by AggregateData, a missing or invalid one makes it fail.
+SHOT_SCHEMA = {
+    "shotId": Field("number"),
+    "clubType": Field("number", nullable=True),
+    "clubId": Field("number", nullable=True),
+    "startLat": Field("number"),
+    "startLong": Field("number"),
+    "endLat": Field("number", nullable=True),
+    "endLong": Field("number", nullable=True),
+    "distance": Field("number", nullable=True),
+    "startAltitude": Field("number", nullable=True),
+    "endAltitude": Field("number", nullable=True),
+    "shotTime": Field("timestamp", nullable=True),
+    "noOfPenalties": Field("number", nullable=True),
+    "isHalfSwing": Field("boolean", nullable=True),
+    "shouldIgnore": Field("boolean", nullable=True),
+    "isSandUser": Field("boolean", nullable=True),
+    "isNonSandUser": Field("boolean", nullable=True),
+    "shouldConsiderPuttAsChip": Field("boolean", nullable=True),
+}
+
+HOLE_SCHEMA = {
+    "holeId": Field("number"),
+    "noOfShots": Field("number"),
+    "pinLat": Field("number"),
+    "pinLong": Field("number"),
+    "putts": Field("number", nullable=True),
+    "approachShotId": Field("number", nullable=True),
+    "startTime": Field("timestamp", nullable=True),
+    "endTime": Field("timestamp", nullable=True),
+    "isFairWayRight": Field("boolean", nullable=True),
+    "isFairWayLeft": Field("boolean", nullable=True),
+    # Among the boolean features of AggregateData, but a number of strokes: its mapping leaves other values as is.
+    "scoreOverride": Field("number", nullable=True),
+    "isSandSave": Field("boolean", nullable=True),
+    "isUpDown": Field("boolean", nullable=True),
+    "isFairWayRightUser": Field("boolean", nullable=True),
+    "isFairWayUser": Field("boolean", nullable=True),
+    "isFairWayLeftUser": Field("boolean", nullable=True),
+    "isGir": Field("boolean", nullable=True),
+    "isFairWay": Field("boolean", nullable=True),
+    "isSandSaveChance": Field("boolean", nullable=True),
+    "shots": Field(ListOf(SHOT_SCHEMA)),
+}
+
+ROUND_SCHEMA = {
+    "roundId": Field("number"),
+    "userId": Field("string"),
+    "courseId": Field("number"),
+    "startTime": Field("timestamp"),
+    "endTime": Field("timestamp", nullable=True),
+    "holes": Field(ListOf(HOLE_SCHEMA, min_length=1, same_keys=True)),
+}
+
+TERRAIN_SHOT_SCHEMA = {
+    "shotId": Field("number"),
+    "startDistanceToCG": Field("number", nullable=True),
+    "startTerrain": Field("string", nullable=True),
+    "endTerrain": Field("string", nullable=True),
+}
+
+TERRAIN_HOLE_SCHEMA = {
+    "holeId": Field("number"),
+    "par": Field("number", nullable=True),
+    "drive": Field(ListOf(TERRAIN_SHOT_SCHEMA)),
+    "approach": Field(ListOf(TERRAIN_SHOT_SCHEMA)),
+    "chip": Field(ListOf(TERRAIN_SHOT_SCHEMA)),
+    "sand": Field(ListOf(TERRAIN_SHOT_SCHEMA)),
+}
+
+TERRAIN_SCHEMA = {
+    "roundId": Field("number"),
+    "holes": Field(ListOf(TERRAIN_HOLE_SCHEMA, min_length=1, same_keys=True)),
+}
+
+COURSE_SCHEMA = {
+    "courses": Field(ListOf({"courseId": Field("number"), "name": Field("string", nullable=True)})),
+}
+
+_check_round = compile_schema(ROUND_SCHEMA)
+_check_terrain = compile_schema(TERRAIN_SCHEMA)
+_check_course = compile_schema(COURSE_SCHEMA)
+
+
+def validate_round(document):
+    """Returns the list of problems of a rounds document, empty if it is valid."""
+    errors = []
+    _check_round(document, (), errors)
+    return errors
+
+
+def validate_terrain(document):
+    """Returns the list of problems of a terrain document, empty if it is valid."""
+    errors = []
+    _check_terrain(document, (), errors)
+    return errors
+
+
+def validate_course(document):
+    """Returns the list of problems of a course document, empty if it is valid."""
+    errors = []
+    _check_course(document, (), errors)
+    return errors
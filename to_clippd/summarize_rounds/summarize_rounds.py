@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+# Keys of each level of summary, in the order of a Clippd Dataframe, so each group is a contiguous block of rows.
+HOLE_KEYS = ["data_source", "player_id", "round_id", "hole_id"]
+ROUND_KEYS = ["data_source", "player_id", "round_id"]
+PLAYER_KEYS = ["data_source", "player_id"]
+
+SHOT_CATEGORIES = ["TeeShot", "ApproachShot", "GreensideShot", "Putt"]
+SHOT_TYPES = ["TeeShot", "GoingForGreen", "LayUp", "Recovery", "GreensideShot", "Putt"]
+MISS_DIRECTIONS = ["Left", "Right", "Short", "Long"]
+
+# Lies of a shot that reached the green.
+ON_GREEN = ["Green", "In The Hole"]
+
+# Values taken from the first row of each group.
+HOLE_FIRSTS = ["round_time", "course_id", "hole_par", "hole_score"]
+ROUND_FIRSTS = ["round_time", "course_id"]
+
+
+def _snake_case(name):
+    return "".join("_" + c.lower() if c.isupper() else c for c in name).lstrip("_")
+
+
+def _group_starts(data, keys):
+    """Returns the positions of the first row of each group of keys, None if the groups are not contiguous."""
+    if not len(data):
+        return np.empty(0, dtype=np.int64)
+    change = np.zeros(len(data), dtype=bool)
+    change[0] = True
+    for key in keys:
+        codes = pd.factorize(data[key])[0]
+        change[1:] |= codes[1:] != codes[:-1]
+    starts = np.flatnonzero(change)
+    if len(starts) != len(data[keys].drop_duplicates()):
+        return None
+    return starts
+
+
+def _reduce(data, keys, firsts, sums):
+    """
+    Sums columns over contiguous groups in one pass, with np.add.reduceat.
+
+    Args:
+        data: Dataframe whose groups of keys are contiguous
+        keys: Columns identifying a group
+        firsts: Columns whose value is taken from the first row of each group
+        sums: Dataframe with the same rows as data, of the columns to sum
+    Returns:
+        (dataframe) one row per group with keys, firsts and sums
+    """
+    starts = _group_starts(data, keys)
+    summary = data[keys + firsts].iloc[starts].reset_index(drop=True)
+    if len(starts):
+        values = np.add.reduceat(sums.to_numpy(dtype=np.float64), starts, axis=0)
+    else:
+        values = np.empty((0, sums.shape[1]))
+    return pd.concat([summary, pd.DataFrame(values, columns=sums.columns)], axis=1)
+
+
+def _add_rates(summary):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        summary["gir_rate"] = summary["gir"] / summary["holes"]
+        summary["fairway_rate"] = summary["fairways_hit"] / summary["fairway_chances"]
+    return summary
+
+
+class SummarizeRounds(object):
+    """
+    Summarizes a Clippd Dataframe per hole, per round and per player.
+
+    Each summary is computed in one pass over the rows, sorted like MapToClippd sorts them: the shot values are
+    summed over contiguous holes with np.add.reduceat, then the holes over rounds and the rounds over players.
+    Summaries are strokes gained (total, per shot category and per shot type), greens in regulation, fairways, putts
+    and miss directions. update keeps the summaries of all the rounds seen so far, and only the rows of the new
+    rounds are summarized.
+
+    A green in regulation is a hole whose green is reached (or holed) within par - 2 strokes, the penalty strokes of
+    the hole counted as taken before the green. A fairway chance is a hole of par 4 or more, hit when the first shot
+    ends on the fairway.
+
+    Attributes:
+        holes: Dataframe with the summary of each hole seen by update, None before the first update
+        rounds: Dataframe with the summary of each round seen by update, None before the first update
+        players: Dataframe with the summary of each player seen by update, None before the first update
+    """
+
+    def __init__(self):
+        self.holes = None
+        self.rounds = None
+        self.players = None
+
+    @staticmethod
+    def __shot_values(data, starts):
+        """Dataframe of the values of each shot to sum per hole."""
+        n = len(data)
+        lengths = np.diff(np.append(starts, n))
+        shot_number = np.arange(n) - np.repeat(starts, lengths) + 1
+        strokes_gained = np.nan_to_num(data["shot_strokes_gained"].to_numpy(dtype=np.float64))
+        category = data["shot_category"].to_numpy()
+        shot_type = data["shot_type"].to_numpy()
+        end_lie = data["shot_end_lie"]
+        miss_direction = data["shot_miss_direction"].astype(str)
+
+        values = {"shots": np.ones(n), "putts": category == "Putt"}
+        values["strokes_gained"] = strokes_gained
+        for column in data.columns:
+            # Strokes gained against the additional benchmarks of DeriveInsights.
+            if column.startswith("shot_strokes_gained_"):
+                name = column[len("shot_strokes_gained_"):]
+                values["strokes_gained_" + name] = np.nan_to_num(data[column].to_numpy(dtype=np.float64))
+        for name in SHOT_CATEGORIES:
+            values["strokes_gained_category_" + _snake_case(name)] = np.where(category == name, strokes_gained, 0)
+        for name in SHOT_TYPES:
+            values["strokes_gained_type_" + _snake_case(name)] = np.where(shot_type == name, strokes_gained, 0)
+        for name in MISS_DIRECTIONS:
+            values["misses_" + name.lower()] = miss_direction.str.contains(name).to_numpy()
+        values["fairways_hit"] = (shot_number == 1) & (end_lie == "Fairway").to_numpy()
+        # Shots reaching the green, the first of each hole is found after the sum.
+        values["shots_to_green"] = np.where(end_lie.isin(ON_GREEN).to_numpy(), shot_number, np.inf)
+        return pd.DataFrame(values)
+
+    def process(self, data):
+        """
+        Summarizes the rows of a Clippd Dataframe.
+
+        Args:
+            data: Clippd Dataframe, the shots of a hole in order (it is sorted again if the holes, rounds or players
+                  are not contiguous)
+        Returns:
+            None if data is None
+            (dict) "holes", "rounds" and "players" summaries of data
+        """
+        if data is None:
+            return None
+        starts = _group_starts(data, HOLE_KEYS)
+        # Concatenated chunks can have contiguous holes, but a player or a round split in several blocks.
+        if starts is None or any(_group_starts(data, keys) is None for keys in (ROUND_KEYS, PLAYER_KEYS)):
+            data = data.sort_values(by=["data_source", "player_id", "round_time", "round_id", "hole_id", "shot_id"],
+                                    kind="stable")
+            starts = _group_starts(data, HOLE_KEYS)
+
+        values = self.__shot_values(data, starts)
+        shots_to_green = values.pop("shots_to_green").to_numpy()
+        holes = _reduce(data, HOLE_KEYS, HOLE_FIRSTS, values)
+        # The par is missing on some shots of a hole, take it from any of them.
+        par = data["hole_par"].astype(np.float64).to_numpy()
+        if len(starts):
+            holes["hole_par"] = np.fmax.reduceat(par, starts)
+            holes["shots_to_green"] = np.minimum.reduceat(shots_to_green, starts)
+        holes["shots_to_green"] = holes["shots_to_green"].replace(np.inf, np.nan)
+        # Penalty strokes are not rows, they are in the score.
+        penalties = (holes["hole_score"].astype(np.float64) - holes["shots"]).fillna(0)
+        holes["gir"] = holes["shots_to_green"] + penalties <= holes["hole_par"] - 2
+        holes["fairway_chances"] = holes["hole_par"] >= 4
+        holes["fairways_hit"] = holes["fairways_hit"].where(holes["fairway_chances"], 0)
+        return self.__summarize(holes)
+
+    @staticmethod
+    def __summarize(holes):
+        """Summarizes the holes per round and the rounds per player."""
+        sums = [column for column in holes.columns
+                if column not in HOLE_KEYS + HOLE_FIRSTS + ["shots_to_green"]]
+        hole_values = holes[sums].astype(np.float64)
+        hole_values.insert(0, "holes", 1.0)
+        hole_values["score"] = holes["hole_score"].astype(np.float64)
+        hole_values["par"] = holes["hole_par"]
+        rounds = _add_rates(_reduce(holes, ROUND_KEYS, ROUND_FIRSTS, hole_values))
+        return {"holes": holes, "rounds": rounds, "players": SummarizeRounds.__summarize_players(rounds)}
+
+    @staticmethod
+    def __summarize_players(rounds):
+        """Summarizes the rounds, sorted like MapToClippd sorts them, per player."""
+        sums = [column for column in rounds.columns
+                if column not in ROUND_KEYS + ROUND_FIRSTS and not column.endswith("_rate")]
+        round_values = rounds[sums].copy()
+        round_values.insert(0, "rounds", 1.0)
+        return _add_rates(_reduce(rounds, PLAYER_KEYS, [], round_values))
+
+    def update(self, data):
+        """
+        Adds the summaries of the rounds of data to the ones already seen.
+
+        A round seen before is replaced by its new summary. Only the player summaries are recomputed from all the
+        rounds, which are much fewer than the shots.
+
+        Args:
+            data: Clippd Dataframe of new rounds
+        """
+        summaries = self.process(data)
+        if summaries is None:
+            return
+        if self.rounds is not None:
+            new_rounds = pd.MultiIndex.from_frame(summaries["rounds"][ROUND_KEYS])
+            kept_holes = ~pd.MultiIndex.from_frame(self.holes[ROUND_KEYS]).isin(new_rounds)
+            kept_rounds = ~pd.MultiIndex.from_frame(self.rounds[ROUND_KEYS]).isin(new_rounds)
+            summaries["holes"] = pd.concat([self.holes[kept_holes], summaries["holes"]], ignore_index=True)
+            summaries["rounds"] = pd.concat([self.rounds[kept_rounds], summaries["rounds"]], ignore_index=True)
+        self.holes = summaries["holes"].sort_values(by=["data_source", "player_id", "round_time", "round_id",
+                                                        "hole_id"], kind="stable", ignore_index=True)
+        self.rounds = summaries["rounds"].sort_values(by=["data_source", "player_id", "round_time", "round_id"],
+                                                      kind="stable", ignore_index=True)
+        self.players = self.__summarize_players(self.rounds)
@@ -0,0 +1,35 @@
+"""
+Benchmark of the fused shot geometry kernel against the separate shot_misses functions.
+
+Run from the root of the repository:
+    python -m to_clippd.test.benchmark.benchmark_shot_misses
+"""
+import timeit
+
+import numpy as np
+
+import to_clippd.derive_insights.shot_misses as shot_misses
+from to_clippd.test.unit.test_derive_insights.test_shot_misses import random_shots
+from to_clippd.test.unit.test_derive_insights.test_shot_misses import reference_geometry
+
+
+def main(sizes=(10_000, 100_000, 1_000_000), repeat=5):
+    for n in sizes:
+        shots = random_shots(n)
+        buffer = shot_misses.allocate_geometry_buffer(n)
+        buffer_32 = shot_misses.allocate_geometry_buffer(n, np.float32)
+        timings = {
+            "separate functions": lambda: reference_geometry(*shots),
+            "fused kernel": lambda: shot_misses.calculate_shot_geometry(*shots),
+            "fused kernel, reused buffer": lambda: shot_misses.calculate_shot_geometry(*shots, out=buffer),
+            "fused kernel, float32": lambda: shot_misses.calculate_shot_geometry(*shots, dtype=np.float32,
+                                                                                 out=buffer_32),
+        }
+        print("{:,} shots".format(n))
+        for name, function in timings.items():
+            best = min(timeit.repeat(function, number=1, repeat=repeat))
+            print("    {:<30} {:8.2f} ms".format(name, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,12 @@ import unittest
 
 import numpy as np
 import pandas as pd
-from aggregate_data.aggregate_data import AggregateData
 
-PATH_ROUNDS_JSON = "test/unit/test_aggregate_data/round.json"
-PATH_TERRAIN_JSON = "test/unit/test_aggregate_data/terrain.json"
-PATH_COURSE_JSON = "test/unit/test_aggregate_data/2020-12-03T12_20_14.080Z.json"
+from to_clippd.aggregate_data.aggregate_data import AggregateData
+
+PATH_ROUNDS_JSON = "to_clippd/test/unit/test_aggregate_data/round.json"
+PATH_TERRAIN_JSON = "to_clippd/test/unit/test_aggregate_data/terrain.json"
+PATH_COURSE_JSON = "to_clippd/test/unit/test_aggregate_data/2020-12-03T12_20_14.080Z.json"
 
 
 class MyTestCase(unittest.TestCase):
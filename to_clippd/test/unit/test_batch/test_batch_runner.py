@@ -0,0 +1,158 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+import pandas as pd
+
+from to_clippd.batch.batch_runner import BatchRunner
+from to_clippd.batch.batch_runner import shard_of
+from to_clippd.batch.work_queue import WorkQueue
+from to_clippd.to_clippd import ToClippd
+
+PATH_ROUNDS_JSON = "to_clippd/test/unit/test_aggregate_data/round.json"
+PATH_TERRAIN_JSON = "to_clippd/test/unit/test_aggregate_data/terrain.json"
+PATH_COURSE_JSON = "to_clippd/test/unit/test_aggregate_data/2020-12-03T12_20_14.080Z.json"
+
+
+def write_rounds(directory, n_players, rounds_per_player):
+    """Writes copies of the test round for several players, returns their (rounds, terrain, course) files."""
+    with open(PATH_ROUNDS_JSON) as f:
+        rounds = json.load(f)
+    with open(PATH_TERRAIN_JSON) as f:
+        terrain = json.load(f)
+    files = []
+    for player in range(n_players):
+        for i in range(rounds_per_player):
+            round_id = rounds["roundId"] + 100 * player + i
+            for document, name in [(rounds, "round"), (terrain, "terrain")]:
+                document = dict(document, userId="player_{}".format(player), roundId=round_id)
+                with open(os.path.join(directory, "{}_{}.json".format(name, round_id)), "w") as f:
+                    json.dump(document, f)
+            files.append((os.path.join(directory, "round_{}.json".format(round_id)),
+                          os.path.join(directory, "terrain_{}.json".format(round_id)),
+                          PATH_COURSE_JSON))
+    return files
+
+
+def run_worker(directory, worker):
+    with patch("sys.stdout", new=StringIO()):
+        BatchRunner(directory, n_shards=4, timeout=5, poll_interval=0.1).work(worker)
+
+
+class FailingToClippd(ToClippd):
+    def process(self, source, rounds_file, terrain_file, course_file):
+        if rounds_file == "broken":
+            raise ValueError("broken chunk")
+        return super().process(source, rounds_file, terrain_file, course_file)
+
+
+class MyTestCase(unittest.TestCase):
+    def test_shard_of_is_deterministic(self):
+        self.assertEqual(shard_of("69783540370211eb89ce5334d9db98d8", 16),
+                         shard_of("69783540370211eb89ce5334d9db98d8", 16))
+        self.assertEqual({shard_of("player_{}".format(i), 4) for i in range(100)}, {0, 1, 2, 3})
+
+    def test_partition_keeps_players_together(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_rounds(directory, 5, 2)
+            shards = BatchRunner(directory, n_shards=3).partition(files)
+            self.assertEqual(sum(len(chunks) for chunks in shards.values()), 10)
+            for shard, chunks in shards.items():
+                for chunk in chunks:
+                    with open(chunk[0]) as f:
+                        self.assertEqual(shard_of(json.load(f)["userId"], 3), shard)
+
+    def test_partition_list_of_rounds(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_rounds(directory, 1, 4)
+            for rounds_file, _, _ in files:
+                with open(rounds_file) as f:
+                    rounds = json.load(f)
+                with open(rounds_file, "w") as f:
+                    json.dump([rounds, dict(rounds, roundId=rounds["roundId"] + 50)], f)
+            shards = BatchRunner(directory, n_shards=16).partition(files)
+            self.assertEqual(list(shards), [shard_of("player_0", 16)], "A player's files must share a shard")
+
+    def test_partition_splits_players_of_list_of_rounds(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_rounds(directory, 4, 1)
+            rounds = []
+            for rounds_file, _, _ in files:
+                with open(rounds_file) as f:
+                    rounds.append(json.load(f))
+            with open(files[0][0], "w") as f:
+                json.dump(rounds, f)
+            shards = BatchRunner(directory, n_shards=4).partition(files[:1])
+            self.assertEqual(set(shards), {shard_of("player_{}".format(i), 4) for i in range(4)})
+            n_rounds = 0
+            for shard, chunks in shards.items():
+                self.assertEqual(len(chunks), 1)
+                self.assertEqual(chunks[0][1:], list(files[0][1:]))
+                with open(chunks[0][0]) as f:
+                    split_rounds = json.load(f)
+                self.assertEqual({shard_of(round_data["userId"], 4) for round_data in split_rounds}, {shard})
+                n_rounds += len(split_rounds)
+            self.assertEqual(n_rounds, 4)
+
+    def test_several_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_rounds(directory, 6, 2)
+            runner = BatchRunner(directory, n_shards=4, timeout=5)
+            runner.submit(files)
+            workers = [multiprocessing.Process(target=run_worker, args=(directory, "worker_{}".format(i)))
+                       for i in range(3)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            self.assertEqual(runner.work_queue.counts(), {"done": len(runner.partition(files))})
+            output = runner.merge()
+
+            cl = ToClippd()
+            expected = pd.concat([cl.process("arccos", *chunk) for chunk in files], ignore_index=True)
+            expected.sort_values(by=["data_source", "player_id", "round_time", "round_id", "hole_id"], inplace=True)
+            expected.reset_index(drop=True, inplace=True)
+            pd.testing.assert_frame_equal(output, expected)
+
+    def test_reclaim_after_timeout(self):
+        with tempfile.TemporaryDirectory() as directory:
+            work_queue = WorkQueue(os.path.join(directory, "queue.sqlite"), timeout=0.2)
+            work_queue.add(0, ["chunk"])
+            self.assertEqual(work_queue.claim("a"), (0, ["chunk"]))
+            self.assertIsNone(work_queue.claim("b"), "A shard with recent heartbeats can't be claimed")
+            time.sleep(0.3)
+            self.assertEqual(work_queue.claim("b"), (0, ["chunk"]))
+            self.assertFalse(work_queue.heartbeat(0, "a"))
+            self.assertFalse(work_queue.complete(0, "a", "late"), "A worker that lost its shard can't complete it")
+            self.assertTrue(work_queue.complete(0, "b", "result"))
+            self.assertEqual(work_queue.results(), [(0, "result")])
+
+    def test_fail(self):
+        with tempfile.TemporaryDirectory() as directory:
+            work_queue = WorkQueue(os.path.join(directory, "queue.sqlite"), max_attempts=2)
+            work_queue.add(0, [])
+            for _ in range(2):
+                shard, _ = work_queue.claim("a")
+                work_queue.fail(shard, "a")
+            self.assertEqual(work_queue.counts(), {"failed": 1})
+
+    def test_merge_with_failed_shard(self):
+        with tempfile.TemporaryDirectory() as directory:
+            runner = BatchRunner(directory, n_shards=4, timeout=5)
+            runner.submit(write_rounds(directory, 1, 1))
+            runner.work_queue.add(99, [["broken", "broken", "broken"]])
+            with patch("sys.stdout", new=StringIO()):
+                runner.work("a", FailingToClippd())
+            self.assertEqual(runner.work_queue.failed(), [99])
+            with self.assertRaises(RuntimeError):
+                runner.merge()
+            self.assertEqual(len(runner.merge(allow_failed=True)), 74)
+
+
+if __name__ == "__main__":
+    unittest.main()
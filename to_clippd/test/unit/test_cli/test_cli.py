@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+import pandas as pd
+
+from to_clippd.cli.cli import find_files
+from to_clippd.cli.cli import main
+from to_clippd.to_clippd import ToClippd
+
+PATH_ROUNDS_JSON = "to_clippd/test/unit/test_aggregate_data/round.json"
+PATH_TERRAIN_JSON = "to_clippd/test/unit/test_aggregate_data/terrain.json"
+PATH_COURSE_JSON = "to_clippd/test/unit/test_aggregate_data/2020-12-03T12_20_14.080Z.json"
+INVALID_TERRAIN_JSON = "to_clippd/test/unit/test_read_file/test_terrain.json"
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        # Two directories with the same round under two roundIds, and one without a course file.
+        self.directory = tempfile.mkdtemp()
+        for name, round_id in [("a", 1), ("b", 2)]:
+            os.makedirs(os.path.join(self.directory, name))
+            for path in [PATH_ROUNDS_JSON, PATH_TERRAIN_JSON]:
+                with open(path) as f:
+                    document = json.load(f)
+                document["roundId"] = round_id
+                with open(os.path.join(self.directory, name, os.path.basename(path)), "w") as f:
+                    json.dump(document, f)
+            shutil.copy(PATH_COURSE_JSON, os.path.join(self.directory, name))
+        os.makedirs(os.path.join(self.directory, "c"))
+        shutil.copy(PATH_ROUNDS_JSON, os.path.join(self.directory, "c"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_find_files(self):
+        with patch("sys.stderr", new=StringIO()) as fakeOutput:
+            files = find_files([os.path.join(self.directory, "*"), os.path.join(self.directory, "a", "round.json")])
+            self.assertIn("Can't find the course file in", fakeOutput.getvalue())
+        self.assertEqual(files, [tuple(os.path.join(self.directory, name, os.path.basename(path))
+                                       for path in [PATH_ROUNDS_JSON, PATH_TERRAIN_JSON, PATH_COURSE_JSON])
+                                 for name in ["a", "b"]])
+
+    def test_main(self):
+        output = os.path.join(self.directory, "clippd.pkl")
+        profile = os.path.join(self.directory, "profile.txt")
+        cache = os.path.join(self.directory, "cache")
+        with patch("sys.stdout", new=StringIO()), patch("sys.stderr", new=StringIO()):
+            status = main([os.path.join(self.directory, "*"), "-o", output, "--chunk-size", "2", "--profile", profile,
+                           "--cache-dir", cache])
+            expected = ToClippd().process("arccos", PATH_ROUNDS_JSON, PATH_TERRAIN_JSON, PATH_COURSE_JSON)
+        self.assertEqual(status, 0)
+        data = pd.read_pickle(output)
+        self.assertEqual(len(data), 2 * len(expected))
+        self.assertEqual(list(data["round_id"].drop_duplicates()), [1, 2])
+        self.assertEqual(os.listdir(cache), ["geodesic_cache.pkl"], "The working files should be removed")
+        with open(profile) as f:
+            report = f.read()
+        for stage in ["read", "aggregate", "derive", "map", "sort and write", "total", "geodesic cache"]:
+            self.assertIn(stage, report)
+
+    def test_main_with_default_options(self):
+        # One chunk per directory, each going through the process stages.
+        output = os.path.join(self.directory, "clippd.csv")
+        with patch("sys.stdout", new=StringIO()), patch("sys.stderr", new=StringIO()):
+            status = main([os.path.join(self.directory, "*"), "-o", output])
+            expected = ToClippd().process("arccos", PATH_ROUNDS_JSON, PATH_TERRAIN_JSON, PATH_COURSE_JSON)
+        self.assertEqual(status, 0)
+        data = pd.read_csv(output)
+        self.assertEqual(len(data), 2 * len(expected))
+        self.assertEqual(list(data["round_id"].drop_duplicates()), [1, 2])
+
+    def test_main_with_dropped_chunk(self):
+        os.makedirs(os.path.join(self.directory, "d"))
+        shutil.copy(PATH_ROUNDS_JSON, os.path.join(self.directory, "d"))
+        shutil.copy(INVALID_TERRAIN_JSON, os.path.join(self.directory, "d", "terrain.json"))
+        shutil.copy(PATH_COURSE_JSON, os.path.join(self.directory, "d"))
+        output = os.path.join(self.directory, "clippd.csv")
+        with patch("sys.stdout", new=StringIO()), patch("sys.stderr", new=StringIO()) as fakeOutput:
+            status = main([os.path.join(self.directory, "*"), "-o", output])
+        self.assertEqual(status, 1)
+        self.assertIn("Dropped chunk, no data from: " + os.path.join(self.directory, "d", "round.json"),
+                      fakeOutput.getvalue())
+        self.assertEqual(list(pd.read_csv(output)["round_id"].drop_duplicates()), [1, 2])
+
+    def test_main_without_input(self):
+        with patch("sys.stderr", new=StringIO()) as fakeOutput:
+            status = main([os.path.join(self.directory, "d*"), "-o", os.path.join(self.directory, "clippd.csv")])
+        self.assertEqual(status, 1)
+        self.assertIn("No input to process.", fakeOutput.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
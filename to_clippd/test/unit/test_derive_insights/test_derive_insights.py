@@ -1,10 +1,14 @@
+import sys
 import unittest
 
 import numpy as np
 import pandas as pd
-from derive_insights.derive_insights import DeriveInsights
 
-PATH_DATA_PICKLE = "test/unit/test_derive_insights/arccos_data.pkl"
+from to_clippd.derive_insights.derive_insights import coordinates
+from to_clippd.derive_insights.derive_insights import DeriveInsights
+from to_clippd.derive_insights.shot_statistics import RunningShotStatistics
+
+PATH_DATA_PICKLE = "to_clippd/test/unit/test_derive_insights/arccos_data.pkl"
 
 
 class MyTestCase(unittest.TestCase):
@@ -40,6 +44,34 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(output.iloc[0]["shot_type"], "ApproachShot")
         self.assertEqual(output.iloc[0]["shot_subtype"], "LayUp")
 
+    def test_coordinates_are_float_columns(self):
+        df = pd.read_pickle(PATH_DATA_PICKLE)
+        output = DeriveInsights().process(df)
+        self.assertNotIn("start_coordinates", output.columns, "No tuple column should be created by default")
+        start = coordinates(output, "start")
+        self.assertEqual(start.shape, (len(output), 2))
+        self.assertEqual(start.dtype, np.float64)
+        np.testing.assert_array_equal(start[:, 0], output["shot_startLat"].values)
+
+    def test_coordinate_tuples_compatibility(self):
+        df = pd.read_pickle(PATH_DATA_PICKLE)
+        floats = DeriveInsights().process(df.copy())
+        tuples = DeriveInsights(coordinate_tuples=True).process(df.copy())
+        self.assertEqual(tuples.iloc[0]["end_coordinates"], (tuples.iloc[0]["shot_endLat"], tuples.iloc[0]["shot_endLong"]))
+        pd.testing.assert_frame_equal(tuples[floats.columns], floats)
+        # Each tuple column costs at least one Python tuple per shot.
+        tuple_size = sys.getsizeof((0.0, 0.0))
+        self.assertLess(floats.memory_usage(deep=True).sum(),
+                        tuples.memory_usage(deep=True).sum() - 3 * tuple_size * len(df))
+
+    def test_impute_shot_type_with_running_statistics(self):
+        df = pd.read_pickle(PATH_DATA_PICKLE)
+        expected = DeriveInsights().process(df.copy())
+        statistics = RunningShotStatistics()
+        output = DeriveInsights(running_statistics=statistics).process(df.copy())
+        pd.testing.assert_series_equal(output["shot_subtype"], expected["shot_subtype"])
+        self.assertEqual(statistics.statistics["count"].values.sum(), 2 * len(df))
+
 
 if __name__ == "__main__":
     unittest.main()
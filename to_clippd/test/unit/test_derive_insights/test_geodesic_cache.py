@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from to_clippd.derive_insights.derive_insights import DeriveInsights
+from to_clippd.derive_insights.derive_insights import distance_yards
+from to_clippd.derive_insights.geodesic_cache import GeodesicCache
+from to_clippd.test.unit.test_derive_insights.test_parallel import several_players
+
+PATH_DATA_PICKLE = "to_clippd/test/unit/test_derive_insights/arccos_data.pkl"
+
+
+class MyTestCase(unittest.TestCase):
+    def test_same_distances_as_geopy(self):
+        data = pd.read_pickle(PATH_DATA_PICKLE)
+        for column in ["shot_startLat", "shot_startLong", "hole_pinLat", "hole_pinLong"]:
+            data[column] = data[column].astype(np.float64)
+        expected = distance_yards(data, "start", "pin")
+        cache = GeodesicCache()
+        np.testing.assert_array_equal(distance_yards(data, "start", "pin", cache), expected)
+        self.assertEqual(cache.stats(), {"size": len(data), "hits": 0, "misses": len(data), "evictions": 0,
+                                         "hit_rate": 0})
+        # The second round on the same course only reads the cache.
+        np.testing.assert_array_equal(distance_yards(data, "start", "pin", cache), expected)
+        self.assertEqual(cache.hit_rate, 0.5)
+
+    def test_least_recently_used_evicted(self):
+        cache = GeodesicCache(max_size=2)
+        points = np.array([[52.0, 0.1, 52.1, 0.1], [52.0, 0.2, 52.1, 0.2], [52.0, 0.3, 52.1, 0.3]])
+        cache.distance_yards(*points[:2].T)
+        cache.distance_yards(*points[:1].T)
+        cache.distance_yards(*points[2:].T)
+        self.assertEqual(list(cache.entries), [tuple(points[0]), tuple(points[2])])
+        self.assertEqual(cache.evictions, 1)
+
+    def test_quantized_keys(self):
+        cache = GeodesicCache(precision=6)
+        first = cache.distance_yards([52.0], [0.1], [52.1], [0.1])
+        second = cache.distance_yards([52.00000001], [0.1], [52.1], [0.1])
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(cache.hits, 1)
+
+    def test_missing_coordinates(self):
+        cache = GeodesicCache()
+        with self.assertRaises(ValueError):
+            cache.distance_yards([np.nan], [0.1], [52.1], [0.1])
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_save_and_load(self):
+        cache = GeodesicCache()
+        distances = cache.distance_yards([52.0, 52.0], [0.1, 0.2], [52.1, 52.1], [0.1, 0.2])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "geodesic_cache.pkl")
+            cache.save(path)
+            loaded = GeodesicCache.load(path, max_size=1)
+        self.assertEqual(list(loaded.entries.values()), [distances[1]], "The most recent pairs should be kept")
+
+    def test_derive_insights_with_cache(self):
+        expected = DeriveInsights().process(pd.read_pickle(PATH_DATA_PICKLE))
+        di = DeriveInsights(geodesic_cache=GeodesicCache())
+        di.process(pd.read_pickle(PATH_DATA_PICKLE))
+        output = di.process(pd.read_pickle(PATH_DATA_PICKLE))
+        pd.testing.assert_frame_equal(output, expected)
+        self.assertGreater(di.geodesic_cache.hit_rate, 0.5)
+
+    def test_merge_changes(self):
+        copy = GeodesicCache()
+        copy.distance_yards([52.0], [0.1], [52.1], [0.1])
+        counters = copy.track_changes()
+        copy.distance_yards([52.0, 52.0], [0.2, 0.1], [52.1, 52.1], [0.2, 0.1])
+        cache = GeodesicCache(max_size=2, entries=[((1.0, 1.0, 1.0, 1.0), 0.0)])
+        cache.merge(copy.changes_since(counters))
+        self.assertEqual(list(cache.entries), [(52.0, 0.2, 52.1, 0.2), (52.0, 0.1, 52.1, 0.1)])
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 1, 1))
+
+    def test_merge_changes_with_repeated_pairs(self):
+        copy = GeodesicCache()
+        copy.distance_yards([52.0, 52.0], [0.1, 0.3], [52.1, 52.1], [0.1, 0.3])
+        counters = copy.track_changes()
+        # 4 lookups of 2 pairs, the pair 0.3 was not looked up since track_changes.
+        copy.distance_yards([52.0, 52.0, 52.0, 52.0], [0.2, 0.1, 0.2, 0.1], [52.1] * 4, [0.2, 0.1, 0.2, 0.1])
+        changes = copy.changes_since(counters)
+        self.assertEqual([key for key, _ in changes["pairs"]], [(52.0, 0.2, 52.1, 0.2), (52.0, 0.1, 52.1, 0.1)])
+        cache = GeodesicCache(entries=[((52.0, 0.1, 52.1, 0.1), 1.0), ((1.0, 1.0, 1.0, 1.0), 0.0)])
+        cache.merge(changes)
+        self.assertEqual(list(cache.entries), [(1.0, 1.0, 1.0, 1.0), (52.0, 0.2, 52.1, 0.2), (52.0, 0.1, 52.1, 0.1)])
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_derive_insights_with_jobs_and_cache(self):
+        df = several_players(4)
+        expected = DeriveInsights().process(df.copy())
+        # Exact keys, the moved shots of the players could share a rounded one.
+        cache = GeodesicCache(precision=None)
+        di = DeriveInsights(jobs=2, geodesic_cache=cache)
+        try:
+            di.process(df.copy())
+            first = cache.stats()
+            output = di.process(df.copy())
+        finally:
+            di.close()
+        pd.testing.assert_frame_equal(output, expected, check_exact=True)
+        self.assertGreater(first["size"], 0, "The distances of the workers should be merged back")
+        self.assertEqual(cache.stats()["size"], first["size"])
+        # A shard can go to another worker than the first time, so the second call may have misses too.
+        self.assertEqual(cache.hits + cache.misses, 2 * (first["hits"] + first["misses"]),
+                         "Every lookup of the workers should be counted")
+
+
+if __name__ == "__main__":
+    unittest.main()
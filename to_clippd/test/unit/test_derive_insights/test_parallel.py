@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from to_clippd.derive_insights.derive_insights import DeriveInsights
+from to_clippd.derive_insights.parallel import shard_by_player
+from to_clippd.derive_insights.shot_statistics import RunningShotStatistics
+
+PATH_DATA_PICKLE = "to_clippd/test/unit/test_derive_insights/arccos_data.pkl"
+
+
+def several_players(n_players):
+    """Copies the shots of the test round for n_players players, with slightly moved shots."""
+    df = pd.read_pickle(PATH_DATA_PICKLE)
+    rng = np.random.default_rng(0)
+    players = []
+    for i in range(n_players):
+        player = df.copy()
+        player["round_userId"] = "player_" + str(i)
+        player["roundId"] = player["roundId"] + i
+        player["shot_startLat"] = player["shot_startLat"] + rng.normal(0, 0.00005, len(player))
+        player["shot_endLat"] = player["shot_endLat"] + rng.normal(0, 0.00005, len(player))
+        # Drop some shots so the players don't all have the same number of shots.
+        players.append(player.iloc[:len(player) - i])
+    return pd.concat(players, ignore_index=True)
+
+
+class MyTestCase(unittest.TestCase):
+    def test_shard_by_player(self):
+        df = pd.DataFrame({"round_userId": ["a"] * 6 + ["b"] * 3 + ["c"] * 3 + ["a"]})
+        shards = shard_by_player(df, 2)
+        self.assertEqual([list(positions) for positions in shards], [[0, 1, 2, 3, 4, 5, 12], [6, 7, 8, 9, 10, 11]])
+        self.assertEqual(len(shard_by_player(df, 10)), 3, "There can't be more shards than players")
+
+    def test_shard_without_players(self):
+        df = pd.DataFrame({"round_userId": [None, None, None]})
+        self.assertEqual([list(positions) for positions in shard_by_player(df, 2)], [[0, 1, 2]])
+        df = pd.DataFrame({"round_userId": ["a", None, "b", "a"]})
+        self.assertEqual([list(positions) for positions in shard_by_player(df, 2)], [[0, 1, 3], [2]])
+
+    def test_process_with_jobs_equals_single_process(self):
+        df = several_players(5)
+        expected = DeriveInsights().process(df.copy())
+        di = DeriveInsights(jobs=2)
+        try:
+            output = di.process(df.copy())
+        finally:
+            di.close()
+        pd.testing.assert_frame_equal(output, expected, check_exact=True)
+
+    def test_process_with_jobs_when_first_shot_is_missing(self):
+        # The hole length of a player whose first row isn't a first shot must not come from another player.
+        df = several_players(4)
+        df = df.drop(df.index[df["round_userId"] == "player_1"][0]).reset_index(drop=True)
+        expected = DeriveInsights().process(df.copy())
+        di = DeriveInsights(jobs=2)
+        try:
+            output = di.process(df.copy())
+        finally:
+            di.close()
+        pd.testing.assert_frame_equal(output, expected, check_exact=True)
+
+    def test_jobs_with_running_statistics(self):
+        with self.assertRaises(ValueError):
+            DeriveInsights(running_statistics=RunningShotStatistics(), jobs=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+
+import to_clippd.derive_insights.shot_misses as shot_misses
+
+
+def random_shots(n, seed=0):
+    """Creates n random shots around a hole, with some shots ending in the hole."""
+    rng = np.random.default_rng(seed)
+    pin_lat = 52.1656 + rng.normal(0, 0.01, n)
+    pin_long = 0.1687 + rng.normal(0, 0.01, n)
+    start_lat = pin_lat + rng.normal(0, 0.002, n)
+    start_long = pin_long + rng.normal(0, 0.002, n)
+    end_lat = np.where(rng.random(n) < 0.2, pin_lat, pin_lat + rng.normal(0, 0.0003, n))
+    end_long = np.where(end_lat == pin_lat, pin_long, pin_long + rng.normal(0, 0.0003, n))
+    # Approximate distances in yards, good enough to reach every branch of the miss distance calculation.
+    yards = 121640
+    start_distance = np.hypot(start_lat - pin_lat, (start_long - pin_long) * 0.61) * yards
+    end_distance = np.hypot(end_lat - pin_lat, (end_long - pin_long) * 0.61) * yards
+    shot_distance = np.hypot(end_lat - start_lat, (end_long - start_long) * 0.61) * yards
+    return (start_lat, start_long, end_lat, end_long, pin_lat, pin_long,
+            shot_distance, start_distance, end_distance)
+
+
+def reference_geometry(start_lat, start_long, end_lat, end_long, pin_lat, pin_long,
+                       shot_distance, start_distance, end_distance):
+    """Calculates the shot geometry with the separate functions."""
+    start_to_end_bearing = shot_misses.get_bearing(start_lat, start_long, end_lat, end_long)
+    start_to_pin_bearing = shot_misses.get_bearing(start_lat, start_long, pin_lat, pin_long)
+    end_to_pin_bearing = shot_misses.get_bearing(end_lat, end_long, pin_lat, pin_long)
+    miss_bearing_left_right = start_to_end_bearing - start_to_pin_bearing
+    miss_bearing_left_right = np.where(miss_bearing_left_right < 0,
+                                       miss_bearing_left_right + 360,
+                                       miss_bearing_left_right)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        start_end_pin_angle = shot_misses.calculate_start_end_pin_angle(shot_distance, start_distance, end_distance)
+    left_right, short_long = shot_misses.calculate_miss_distance(miss_bearing_left_right,
+                                                                 start_end_pin_angle,
+                                                                 end_distance)
+    return {"start_to_end_bearing": start_to_end_bearing,
+            "start_to_pin_bearing": start_to_pin_bearing,
+            "end_to_pin_bearing": end_to_pin_bearing,
+            "miss_bearing_left_right": miss_bearing_left_right,
+            "start_end_pin_angle": start_end_pin_angle,
+            "shot_miss_distance_left_right": left_right,
+            "shot_miss_distance_short_long": short_long}
+
+
+class MyTestCase(unittest.TestCase):
+    def test_calculate_shot_geometry_equals_separate_functions(self):
+        shots = random_shots(5000)
+        expected = reference_geometry(*shots)
+        output = shot_misses.calculate_shot_geometry(*shots)
+        self.assertEqual(list(output.keys()), list(shot_misses.GEOMETRY_FIELDS))
+        for field in shot_misses.GEOMETRY_FIELDS:
+            np.testing.assert_array_equal(output[field], expected[field], field + " should be identical")
+
+    def test_calculate_shot_geometry_reuses_buffer(self):
+        shots = random_shots(100)
+        buffer = shot_misses.allocate_geometry_buffer(100)
+        output = shot_misses.calculate_shot_geometry(*shots, out=buffer)
+        for field in shot_misses.GEOMETRY_FIELDS:
+            self.assertTrue(np.shares_memory(output[field], buffer), field + " should be written in the buffer")
+
+    def test_calculate_shot_geometry_float32(self):
+        shots = random_shots(1000)
+        expected = reference_geometry(*shots)
+        output = shot_misses.calculate_shot_geometry(*shots, dtype=np.float32)
+        for field in shot_misses.GEOMETRY_FIELDS:
+            self.assertEqual(output[field].dtype, np.float32, field + " should be a float32")
+        # float32 keeps coordinates to about half a metre, the bearings stay within a degree for those distances.
+        np.testing.assert_allclose(output["start_to_pin_bearing"], expected["start_to_pin_bearing"], atol=1)
+        # Most miss distances stay close, the few shots near a branch boundary can be far off (see the docstring).
+        for field in ["shot_miss_distance_left_right", "shot_miss_distance_short_long"]:
+            error = np.abs(output[field] - expected[field])
+            self.assertLess(np.quantile(error, 0.99), 0.5, field + " should be within half a yard for 99% of shots")
+            self.assertLess(np.mean(error > 1), 0.01, field + " should be off by more than a yard for under 1%")
+        self.assertLessEqual(np.max(np.abs(output["shot_miss_distance_short_long"]
+                                           - expected["shot_miss_distance_short_long"])), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.stats import zscore
+
+from to_clippd.derive_insights.shot_statistics import group_zscores
+from to_clippd.derive_insights.shot_statistics import RunningShotStatistics
+from to_clippd.derive_insights.shot_statistics import ZSCORE_COLUMNS
+from to_clippd.derive_insights.shot_statistics import ZSCORE_KEYS
+
+
+def random_shots(n, seed=0):
+    """Creates n random shots of 3 players."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"round_userId": rng.choice(["a", "b", "c"], n),
+                         "shot_type": rng.choice(["TeeShot", "ApproachShot", "Putt"], n),
+                         "shot_clubType": rng.integers(1, 5, n),
+                         "shot_distance_yards_calculated": rng.normal(150, 40, n),
+                         "shot_start_distance_yards": rng.normal(200, 60, n)})
+
+
+class MyTestCase(unittest.TestCase):
+    def test_group_zscores_equals_scipy(self):
+        shots = random_shots(500)
+        # A group with a NaN, a group with one shot and a group without spread.
+        shots.loc[0, "shot_distance_yards_calculated"] = np.nan
+        shots.loc[len(shots)] = ["d", "Putt", 1, 10.0, 12.0]
+        shots.loc[len(shots)] = ["e", "Putt", 1, 10.0, 12.0]
+        shots.loc[len(shots)] = ["e", "Putt", 1, 10.0, 12.0]
+        output = group_zscores(shots)
+        for column in ZSCORE_COLUMNS:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                expected = shots.groupby(ZSCORE_KEYS)[column].transform(zscore, ddof=1)
+            np.testing.assert_allclose(output[column].values, expected.values, rtol=1e-12, atol=1e-12)
+
+    def test_running_statistics_match_group_zscores(self):
+        shots = random_shots(500)
+        statistics = RunningShotStatistics()
+        statistics.update(shots)
+        np.testing.assert_allclose(statistics.zscores(shots).values, group_zscores(shots).values,
+                                   rtol=1e-9, atol=1e-12)
+
+    def test_running_statistics_incremental_update(self):
+        shots = random_shots(600)
+        batch = RunningShotStatistics()
+        batch.update(shots)
+        incremental = RunningShotStatistics()
+        for start in range(0, 600, 50):
+            incremental.update(shots.iloc[start:start + 50])
+        incremental_statistics = incremental.statistics.reindex(batch.statistics.index)
+        np.testing.assert_allclose(incremental_statistics.values, batch.statistics.values, rtol=1e-9)
+        # A new round is compared with the whole history.
+        new_round = shots.iloc[:10]
+        np.testing.assert_allclose(incremental.zscores(new_round).values, group_zscores(shots).iloc[:10].values,
+                                   rtol=1e-9, atol=1e-12)
+
+    def test_running_statistics_save_and_load(self):
+        shots = random_shots(100)
+        statistics = RunningShotStatistics()
+        statistics.update(shots)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "statistics.pkl")
+            statistics.save(path)
+            loaded = RunningShotStatistics.load(path)
+        pd.testing.assert_frame_equal(loaded.zscores(shots), statistics.zscores(shots))
+
+    def test_running_statistics_empty(self):
+        output = RunningShotStatistics().zscores(random_shots(5))
+        self.assertTrue(output.isna().all().all(), "Without statistics the z-scores should be NaN")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.interpolate import interp1d
+
+import to_clippd.derive_insights.stroke_gained as stroke_gained
+from to_clippd.derive_insights.derive_insights import DeriveInsights
+
+PATH_DATA_PICKLE = "to_clippd/test/unit/test_derive_insights/arccos_data.pkl"
+PATH_BENCHMARK = "to_clippd/derive_insights/PGA Benchmark.csv"
+PATH_PUTTING_BENCHMARK = "to_clippd/derive_insights/PGA Putting Benchmark.csv"
+
+
+def expected_shots_functions(benchmark):
+    """Creates the interp1d functions used by strokes_gained_calculation from a benchmark."""
+    return {"expected_shots_" + lie.lower(): interp1d(*benchmark[lie], kind="linear") for lie in stroke_gained.LIES}
+
+
+def random_shots(n, seed=0):
+    """Creates n random shots from every lie."""
+    rng = np.random.default_rng(seed)
+    lies = np.array(stroke_gained.LIES + (stroke_gained.IN_THE_HOLE, None))
+    start_lies = rng.choice(lies[:-2], n)
+    end_lies = rng.choice(lies, n)
+    start_distances = np.where(start_lies == "Green", rng.uniform(0, 33, n), rng.uniform(1, 600, n))
+    end_distances = np.where(end_lies == "Green", rng.uniform(0, 33, n), rng.uniform(1, 600, n))
+    shot_numbers = rng.integers(1, 6, n).astype(float)
+    next_shot_numbers = np.where(rng.random(n) < 0.2, np.nan, shot_numbers + 1)
+    return start_lies, start_distances, end_lies, end_distances, shot_numbers, next_shot_numbers
+
+
+def write_benchmark(directory, name, factor):
+    """Writes the PGA benchmark with all the expected shots multiplied by factor, returns the 2 file names."""
+    benchmark = pd.read_csv(PATH_BENCHMARK)
+    benchmark[list(stroke_gained.LIES[:-1])] *= factor
+    put = pd.read_csv(PATH_PUTTING_BENCHMARK)
+    put["Expected putts"] *= factor
+    files = (os.path.join(directory, name + ".csv"), os.path.join(directory, name + " putting.csv"))
+    benchmark.to_csv(files[0], index=False)
+    put.to_csv(files[1], index=False)
+    return files
+
+
+class MyTestCase(unittest.TestCase):
+    def test_strokes_gained_equals_strokes_gained_calculation(self):
+        benchmark = stroke_gained.read_benchmark(PATH_BENCHMARK, PATH_PUTTING_BENCHMARK)
+        shots = random_shots(2000)
+        vect_func = np.vectorize(stroke_gained.strokes_gained_calculation)
+        expected = vect_func(*shots, stroke_gained.expected_shots, expected_shots_functions(benchmark))
+        output = stroke_gained.StrokesGainedBenchmarks({"PGA": benchmark}).strokes_gained(*shots)
+        self.assertEqual(output.shape, (1, 2000))
+        np.testing.assert_array_equal(output[0], expected)
+
+    def test_strokes_gained_several_benchmarks(self):
+        pga = stroke_gained.read_benchmark(PATH_BENCHMARK, PATH_PUTTING_BENCHMARK)
+        # A benchmark on other distances, that stops at 300 yards.
+        short = {lie: (distances[distances <= 300] + (lie != "Green") * 0.5, shots[distances <= 300])
+                 for lie, (distances, shots) in pga.items()}
+        shots = random_shots(2000)
+        both = stroke_gained.StrokesGainedBenchmarks({"PGA": pga, "short": short}).strokes_gained(*shots)
+        pga_alone = stroke_gained.StrokesGainedBenchmarks({"PGA": pga}).strokes_gained(*shots)
+        np.testing.assert_allclose(both[0], pga_alone[0], rtol=1e-12)
+        # Outside of its range, the short benchmark gives NaN instead of raising.
+        in_range = (shots[1] <= 300) & (shots[3] <= 300)
+        short_alone = stroke_gained.StrokesGainedBenchmarks({"short": short}).strokes_gained(
+            *(values[in_range] for values in shots))
+        np.testing.assert_allclose(both[1][in_range], short_alone[0], rtol=1e-12)
+        self.assertTrue(np.isnan(both[1][shots[1] > 301]).all())
+
+    def test_expected_shots_out_of_range(self):
+        benchmark = stroke_gained.read_benchmark(PATH_BENCHMARK, PATH_PUTTING_BENCHMARK)
+        benchmarks = stroke_gained.StrokesGainedBenchmarks({"PGA": benchmark})
+        with self.assertRaises(ValueError):
+            benchmarks.expected_shots(np.array(["Tee"]), np.array([1000.0]))
+
+    def test_derive_insights_several_benchmarks(self):
+        df = pd.read_pickle(PATH_DATA_PICKLE)
+        expected = DeriveInsights().process(df.copy())
+        with tempfile.TemporaryDirectory() as directory:
+            benchmarks = {"PGA": (PATH_BENCHMARK, PATH_PUTTING_BENCHMARK),
+                          "scratch": write_benchmark(directory, "scratch", 1.1)}
+            output = DeriveInsights(benchmarks=benchmarks).process(df.copy())
+        pd.testing.assert_series_equal(output["strokes_gained_calculated"], expected["strokes_gained_calculated"])
+        self.assertIn("strokes_gained_calculated_scratch", output.columns)
+        self.assertFalse(output["strokes_gained_calculated_scratch"].equals(output["strokes_gained_calculated"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from to_clippd.map_to_clippd.external_sort import ExternalSort
+from to_clippd.map_to_clippd.external_sort import SORT_KEY
+
+
+def make_data(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "data_source": pd.Categorical(rng.choice(["arccos", "gsl", None], n), categories=["arccos", "gsl", "whs"],
+                                      ordered=True),
+        "player_id": rng.choice(["a", "b", "c", None], n),
+        "round_time": pd.to_datetime(rng.choice([0, 5 * 10 ** 8, 10 ** 9, None], n), unit="s", utc=True),
+        "round_id": rng.choice([1.0, 2.0, np.nan], n),
+        "hole_id": rng.integers(1, 19, n),
+        "shot_id": np.arange(n),
+    })
+
+
+class MyTestCase(unittest.TestCase):
+    def sort(self, data, chunk_size, **kwargs):
+        external_sort = ExternalSort(**kwargs)
+        for start in range(0, len(data), chunk_size):
+            external_sort.add(data.iloc[start:start + chunk_size])
+        runs = len(external_sort.runs)
+        return pd.concat(list(external_sort.merge())), runs
+
+    def test_in_memory(self):
+        data = make_data(1000)
+        output, runs = self.sort(data, 100)
+        self.assertEqual(runs, 0)
+        pd.testing.assert_frame_equal(output, data.sort_values(by=SORT_KEY, kind="stable").reset_index(drop=True))
+
+    def test_spilled_runs_equal_sort_values(self):
+        # Many small runs, merged in two passes, with missing values and ties in the keys.
+        data = make_data(20000)
+        with tempfile.TemporaryDirectory() as directory:
+            output, runs = self.sort(data, 500, memory_limit=10 ** 5, fan_in=4, directory=directory)
+            self.assertEqual(os.listdir(directory), [], "The runs should be removed after the merge")
+        self.assertGreater(runs, 4)
+        pd.testing.assert_frame_equal(output, data.sort_values(by=SORT_KEY, kind="stable").reset_index(drop=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
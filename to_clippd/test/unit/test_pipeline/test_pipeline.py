@@ -0,0 +1,68 @@
+import os
+import time
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from to_clippd.pipeline.pipeline import Pipeline
+
+
+def slow_double(x):
+    time.sleep(0.01)
+    return 2 * x
+
+
+def fail_on_three(x):
+    if x == 6:
+        raise ValueError("bad chunk")
+    return x + 1
+
+
+def die_on_three(x):
+    if x == 3:
+        os._exit(1)
+    return x
+
+
+class MyTestCase(unittest.TestCase):
+    def test_run_threads(self):
+        pipeline = Pipeline([("double", slow_double, "thread"), ("add", fail_on_three, "thread")], queue_size=2)
+        with patch("sys.stdout", new=StringIO()) as fakeOutput:
+            output = list(pipeline.run(range(10)))
+        self.assertEqual(output, [2 * x + 1 if x != 3 else None for x in range(10)])
+        self.assertEqual(fakeOutput.getvalue().strip(), "Can't process chunk in stage add bad chunk")
+        self.assertEqual([report["stage"] for report in pipeline.report], ["double", "add"])
+        for report in pipeline.report:
+            self.assertEqual(report["items"], 10)
+            self.assertLessEqual(report["max_queue_depth"], 2, "The queues should be bounded")
+            self.assertLessEqual(report["utilization"], 1)
+        self.assertIn("double", pipeline.format_report())
+
+    def test_run_processes(self):
+        pipeline = Pipeline([("double", slow_double, "process"), ("add", fail_on_three, "thread")], queue_size=1)
+        with patch("sys.stdout", new=StringIO()):
+            output = list(pipeline.run(range(5)))
+        self.assertEqual(output, [1, 3, 5, None, 9])
+        self.assertEqual(pipeline.report[0]["kind"], "process")
+
+    def test_stop_early(self):
+        pipeline = Pipeline([("double", slow_double, "process")], queue_size=1)
+        results = pipeline.run(range(100))
+        self.assertEqual(next(results), 0)
+        results.close()
+        self.assertIsNone(pipeline.report)
+
+    def test_stage_dies(self):
+        pipeline = Pipeline([("die", die_on_three, "process"), ("double", slow_double, "thread")], queue_size=1)
+        output = []
+        with patch("to_clippd.pipeline.pipeline.LIVENESS_TIMEOUT", 0.1):
+            with self.assertRaisesRegex(RuntimeError, "Stage die died with exit code 1"):
+                for item in pipeline.run(range(10)):
+                    output.append(item)
+        # The items the process had not flushed to its queue are lost with it.
+        self.assertEqual(output, [0, 2, 4][:len(output)])
+        self.assertIsNone(pipeline.report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import pickle
+import subprocess
+import sys
+import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from to_clippd.derive_insights.derive_insights import DeriveInsights
+from to_clippd.pipeline.pipeline import Pipeline
+from to_clippd.pipeline.shared_frame import SharedFrame
+
+PATH_DATA_PICKLE = "to_clippd/test/unit/test_derive_insights/arccos_data.pkl"
+
+# Two process stages, the second slower, so chunks are still waiting in its queue when the first one exits.
+FRESH_INTERPRETER_PIPELINE = """
+import time
+
+import numpy as np
+import pandas as pd
+from to_clippd.pipeline.pipeline import Pipeline
+
+
+def add_column(df):
+    df = df.copy()
+    df["count"] = np.arange(len(df))
+    return df
+
+
+def slow_add_column(df):
+    time.sleep(0.2)
+    return add_column(df)
+
+
+if __name__ == "__main__":
+    df = pd.DataFrame({"x": np.arange(100.0), "s": ["a", "b"] * 50})
+    stages = [("first", add_column, "process"), ("second", slow_add_column, "process")]
+    print([None if frame is None else len(frame) for frame in Pipeline(stages, queue_size=2).run([df] * 6)])
+"""
+
+
+def derived_frame():
+    """Derived test round, with every kind of column the pipeline can send."""
+    df = DeriveInsights(coordinate_tuples=True).process(pd.read_pickle(PATH_DATA_PICKLE))
+    df["data_source"] = pd.Categorical(["arccos"] * len(df), categories=["arccos", "gsl", "whs"], ordered=True)
+    return df
+
+
+def add_column(df):
+    df = df.copy()
+    df["shot_count"] = np.arange(len(df))
+    return df
+
+
+class MyTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        df = derived_frame()
+        for frame in [df, df.reset_index(drop=True), df.set_index("round_userId"), pd.DataFrame()]:
+            output = SharedFrame(frame).to_frame()
+            pd.testing.assert_frame_equal(output, frame, check_exact=True)
+            for column in frame.columns[frame.dtypes == object]:
+                self.assertEqual([type(value) for value in output[column]], [type(value) for value in frame[column]],
+                                 column + " should keep the same Python types")
+
+    def test_only_metadata_is_pickled(self):
+        df = derived_frame().drop(columns=["start_coordinates", "end_coordinates", "pin_coordinates"])
+        shared = SharedFrame(df)
+        self.assertLess(len(pickle.dumps(shared)), len(pickle.dumps(df)) / 4)
+        shared.release()
+
+    def test_shared_memory_is_freed(self):
+        shared = SharedFrame(derived_frame())
+        shared.to_frame()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=shared.name)
+
+    def test_pipeline_in_fresh_interpreter(self):
+        # The resource tracker isn't running yet in a fresh interpreter, each stage process starts its own.
+        env = dict(os.environ, PYTHONPATH=os.getcwd())
+        result = subprocess.run([sys.executable, "-c", FRESH_INTERPRETER_PIPELINE], capture_output=True, text=True,
+                                env=env, timeout=60)
+        self.assertEqual(result.stdout.strip(), str([100] * 6), result.stderr)
+        self.assertNotIn("leaked", result.stderr)
+
+    def test_pipeline_with_shared_memory_equals_pickle(self):
+        df = derived_frame()
+        stages = [("add", add_column, "process"), ("add_again", add_column, "thread")]
+        with_shared_memory = list(Pipeline(stages, shared_memory=True).run([df, df]))
+        with_pickle = list(Pipeline(stages, shared_memory=False).run([df, df]))
+        for output, expected in zip(with_shared_memory, with_pickle):
+            pd.testing.assert_frame_equal(output, expected, check_exact=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
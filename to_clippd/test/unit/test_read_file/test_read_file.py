@@ -2,13 +2,13 @@ import unittest
 from io import StringIO
 from unittest.mock import patch
 
-from read_file.read_file import ReadFile
+from to_clippd.read_file.read_file import ReadFile
 
-PATH_TEST_ROUNDS = "test/unit/test_read_file/test_rounds.json"
-PATH_TEST_TERRAIN = "test/unit/test_read_file/test_terrain.json"
-PATH_TEST_COURSE = "test/unit/test_read_file/test_course.json"
-NOT_EXIST_ROUNDS = "test/unit/test_read_file/DOES_NOT_EXIST.json"
-WRONG_TEST_ROUNDS = "test/unit/test_read_file/to_test_when_wrong_input.txt"
+PATH_TEST_ROUNDS = "to_clippd/test/unit/test_read_file/test_rounds.json"
+PATH_TEST_TERRAIN = "to_clippd/test/unit/test_read_file/test_terrain.json"
+PATH_TEST_COURSE = "to_clippd/test/unit/test_read_file/test_course.json"
+NOT_EXIST_ROUNDS = "to_clippd/test/unit/test_read_file/DOES_NOT_EXIST.json"
+WRONG_TEST_ROUNDS = "to_clippd/test/unit/test_read_file/to_test_when_wrong_input.txt"
 
 
 class MyTestCase(unittest.TestCase):
@@ -19,6 +19,8 @@ class MyTestCase(unittest.TestCase):
             rf = ReadFile("arccos", NOT_EXIST_ROUNDS, PATH_TEST_TERRAIN, PATH_TEST_COURSE)
             rf.load_data()
             self.assertEqual(fakeOutput.getvalue().strip(), "Not all the files exist.")
+        self.assertEqual(rf.errors, [{"file": NOT_EXIST_ROUNDS, "index": None, "roundId": None,
+                                      "errors": ["file not found"]}])
 
     def test_load_data_when_not_json(self):
         # When wrong input, "Can\"t read file, bad format." should be printed
@@ -26,6 +28,10 @@ class MyTestCase(unittest.TestCase):
             rf = ReadFile("arccos", WRONG_TEST_ROUNDS, PATH_TEST_TERRAIN, PATH_TEST_COURSE)
             rf.load_data()
             self.assertEqual(fakeOutput.getvalue().strip(), "Can't read file, bad format.")
+        self.assertIsNone(rf.rounds_data)
+        self.assertEqual([(error["file"], error["index"], error["roundId"]) for error in rf.errors],
+                         [(WRONG_TEST_ROUNDS, None, None)])
+        self.assertTrue(rf.errors[0]["errors"][0].startswith("bad format: "))
 
     def test_private_var_after_load_data(self):
         rf = ReadFile("arccos", PATH_TEST_ROUNDS, PATH_TEST_TERRAIN, PATH_TEST_COURSE)
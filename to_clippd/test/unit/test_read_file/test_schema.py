@@ -0,0 +1,118 @@
+import copy
+import json
+import os
+import tempfile
+import unittest
+
+from to_clippd.aggregate_data.aggregate_data import AggregateData
+from to_clippd.read_file.read_file import ReadFile
+from to_clippd.read_file.schema import MAX_ERRORS
+from to_clippd.read_file.schema import validate_course
+from to_clippd.read_file.schema import validate_round
+from to_clippd.read_file.schema import validate_terrain
+
+PATH_ROUNDS = "to_clippd/round.json"
+PATH_TERRAIN = "to_clippd/terrain.json"
+PATH_COURSE = "to_clippd/2020-12-03T12_20_14.080Z.json"
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class MyTestCase(unittest.TestCase):
+
+    def test_valid_documents(self):
+        self.assertEqual(validate_round(load(PATH_ROUNDS)), [])
+        self.assertEqual(validate_terrain(load(PATH_TERRAIN)), [])
+        self.assertEqual(validate_course(load(PATH_COURSE)), [])
+
+    def test_errors_have_paths(self):
+        rounds = load(PATH_ROUNDS)
+        rounds["holes"][2]["shots"][1]["startLat"] = "abc"
+        del rounds["holes"][3]["pinLat"]
+        rounds["userId"] = None
+        errors = validate_round(rounds)
+        self.assertIn("userId: null", errors)
+        self.assertIn("holes[2].shots[1].startLat: expected a number, got 'abc'", errors)
+        self.assertIn("holes[3].pinLat: missing", errors)
+        self.assertEqual(validate_round([]), ["document: expected an object"])
+        self.assertEqual(validate_terrain({"roundId": 1, "holes": []}), ["holes: expected at least 1 items"])
+
+    def test_boolean_fields(self):
+        rounds = load(PATH_ROUNDS)
+        rounds["holes"][0]["isGir"] = True
+        rounds["holes"][1]["isGir"] = 0
+        rounds["holes"][2]["shots"][0]["isHalfSwing"] = "None"
+        self.assertEqual(validate_round(rounds), [])
+        rounds["holes"][3]["isGir"] = "yes"
+        del rounds["holes"][4]["shots"][0]["shouldIgnore"]
+        self.assertEqual(validate_round(rounds), ["holes[3].isGir: expected a boolean, got 'yes'",
+                                                  "holes[4].shots[0].shouldIgnore: missing"])
+
+    def test_round_missing_a_boolean_field_is_quarantined(self):
+        rounds = load(PATH_ROUNDS)
+        missing = copy.deepcopy(rounds)
+        missing["roundId"] = rounds["roundId"] + 1
+        for hole in missing["holes"]:
+            del hole["isGir"]
+        terrain = load(PATH_TERRAIN)
+        with tempfile.TemporaryDirectory() as directory:
+            rounds_file = os.path.join(directory, "rounds.json")
+            terrain_file = os.path.join(directory, "terrain.json")
+            with open(rounds_file, "w") as f:
+                json.dump([rounds, missing], f)
+            with open(terrain_file, "w") as f:
+                json.dump([terrain, dict(terrain, roundId=missing["roundId"])], f)
+            rf = ReadFile("arccos", rounds_file, terrain_file, PATH_COURSE, validate=True)
+            rf.load_data()
+
+        self.assertEqual(rf.quarantined_rounds, [missing["roundId"]])
+        self.assertEqual(rf.errors[0]["errors"][0], "holes[0].isGir: missing")
+        # AggregateData selects isGir, without the check it would fail on the whole chunk.
+        data = AggregateData().process(rf.rounds_data, rf.terrain_data, rf.course_info)
+        self.assertEqual(set(data["roundId"]), {rounds["roundId"]})
+
+    def test_stops_after_max_errors(self):
+        rounds = load(PATH_ROUNDS)
+        for hole in rounds["holes"]:
+            for shot in hole["shots"]:
+                shot["startLat"] = "abc"
+        self.assertEqual(len(validate_round(rounds)), MAX_ERRORS)
+
+    def test_quarantine_invalid_round(self):
+        rounds = load(PATH_ROUNDS)
+        terrain = load(PATH_TERRAIN)
+        bad_rounds = copy.deepcopy(rounds)
+        bad_rounds["roundId"] = rounds["roundId"] + 1
+        bad_rounds["holes"][0]["shots"][0]["shotTime"] = "yesterday"
+        bad_terrain = copy.deepcopy(terrain)
+        bad_terrain["roundId"] = bad_rounds["roundId"]
+
+        with tempfile.TemporaryDirectory() as directory:
+            rounds_file = os.path.join(directory, "rounds.json")
+            terrain_file = os.path.join(directory, "terrain.json")
+            with open(rounds_file, "w") as f:
+                json.dump([rounds, bad_rounds], f)
+            with open(terrain_file, "w") as f:
+                json.dump([terrain, bad_terrain], f)
+            rf = ReadFile("arccos", rounds_file, terrain_file, PATH_COURSE, validate=True)
+            rf.load_data()
+
+        self.assertEqual(rf.rounds_data, [rounds])
+        self.assertEqual(rf.terrain_data, [terrain])
+        self.assertEqual(rf.quarantined_rounds, [bad_rounds["roundId"]])
+        self.assertEqual(rf.errors, [{"file": rounds_file, "index": 1, "roundId": bad_rounds["roundId"],
+                                      "errors": ["holes[0].shots[0].shotTime: expected a timestamp, got 'yesterday'"]}])
+
+    def test_no_valid_round(self):
+        rf = ReadFile("arccos", PATH_ROUNDS, "to_clippd/test/unit/test_read_file/test_terrain.json", PATH_COURSE, validate=True)
+        rf.load_data()
+        self.assertIsNone(rf.rounds_data)
+        self.assertIsNone(rf.terrain_data)
+        self.assertEqual(len(rf.errors), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
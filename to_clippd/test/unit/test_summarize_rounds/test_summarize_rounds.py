@@ -0,0 +1,79 @@
+import json
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+import pandas as pd
+
+from to_clippd.summarize_rounds.summarize_rounds import SummarizeRounds
+from to_clippd.to_clippd import ToClippd
+
+PATH_ROUNDS_JSON = "to_clippd/test/unit/test_aggregate_data/round.json"
+PATH_TERRAIN_JSON = "to_clippd/test/unit/test_aggregate_data/terrain.json"
+PATH_COURSE_JSON = "to_clippd/test/unit/test_aggregate_data/2020-12-03T12_20_14.080Z.json"
+
+
+class MyTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with patch("sys.stdout", new=StringIO()):
+            cls.data = ToClippd().process("arccos", PATH_ROUNDS_JSON, PATH_TERRAIN_JSON, PATH_COURSE_JSON)
+        # A later round of the same player.
+        cls.next_round = cls.data.copy()
+        cls.next_round["round_id"] = 1
+        cls.next_round["round_time"] += pd.Timedelta(days=1)
+
+    def test_matches_terrain(self):
+        summaries = SummarizeRounds().process(self.data)
+        with open(PATH_TERRAIN_JSON) as f:
+            terrain = json.load(f)
+        holes = summaries["holes"]
+        self.assertEqual(list(holes["gir"]), [hole["isGir"] == "T" for hole in terrain["holes"]])
+        self.assertEqual(list(holes["fairways_hit"] == 1), [hole["isFairWay"] == "T" for hole in terrain["holes"]])
+        self.assertEqual(list(holes["putts"]), [hole["noOfPutts"] for hole in terrain["holes"]])
+        round_summary = summaries["rounds"].iloc[0]
+        self.assertEqual(round_summary["holes"], terrain["noOfHoles"])
+        self.assertEqual(round_summary["gir"], terrain["noOfGirsHit"])
+        self.assertEqual(round_summary["fairways_hit"], terrain["noOfFairWaysHit"])
+        self.assertEqual(round_summary["score"], terrain["adjustedScore"])
+        self.assertAlmostEqual(round_summary["strokes_gained"], self.data["shot_strokes_gained"].sum())
+        self.assertAlmostEqual(round_summary["strokes_gained_category_putt"],
+                               self.data.loc[self.data["shot_category"] == "Putt", "shot_strokes_gained"].sum())
+
+    def test_unsorted_data(self):
+        expected = SummarizeRounds().process(self.data)
+        summaries = SummarizeRounds().process(self.data.sample(frac=1, random_state=0))
+        for level in ["holes", "rounds", "players"]:
+            pd.testing.assert_frame_equal(summaries[level], expected[level])
+
+        # Chunks of process_batch put together: player A, then B, then A again.
+        other_player = self.data.copy()
+        other_player["player_id"] = "B" + other_player["player_id"].astype(str)
+        expected = SummarizeRounds().process(pd.concat([self.data, self.next_round, other_player], ignore_index=True))
+        summaries = SummarizeRounds().process(pd.concat([self.data, other_player, self.next_round], ignore_index=True))
+        for level in ["holes", "rounds", "players"]:
+            pd.testing.assert_frame_equal(summaries[level], expected[level])
+        self.assertEqual(len(summaries["players"]), 2)
+
+    def test_update_equals_process(self):
+        summarize_rounds = SummarizeRounds()
+        summarize_rounds.update(self.data)
+        summarize_rounds.update(self.next_round)
+        # A round seen again replaces its summary.
+        summarize_rounds.update(self.data)
+        expected = SummarizeRounds().process(pd.concat([self.data, self.next_round], ignore_index=True))
+        pd.testing.assert_frame_equal(summarize_rounds.holes, expected["holes"])
+        pd.testing.assert_frame_equal(summarize_rounds.rounds, expected["rounds"])
+        pd.testing.assert_frame_equal(summarize_rounds.players, expected["players"])
+        self.assertEqual(summarize_rounds.players["rounds"].iloc[0], 2)
+
+    def test_summarize_stage(self):
+        files = (PATH_ROUNDS_JSON, PATH_TERRAIN_JSON, PATH_COURSE_JSON)
+        with patch("sys.stdout", new=StringIO()):
+            output = list(ToClippd().process_batch("arccos", [files], process_stages=(), summarize=True))
+        expected = SummarizeRounds().process(self.data)
+        pd.testing.assert_frame_equal(output[0]["rounds"], expected["rounds"])
+
+
+if __name__ == "__main__":
+    unittest.main()
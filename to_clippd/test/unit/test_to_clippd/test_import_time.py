@@ -0,0 +1,37 @@
+import subprocess
+import sys
+import unittest
+
+# Modules only needed by some calls, which must not be imported with the pipeline entry point.
+HEAVY_MODULES = {"seaborn", "matplotlib", "scipy", "geopy", "openpyxl"}
+# Import time budget of the pipeline entry point, pandas and numpy included.
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+
+
+def import_times(module):
+    """Imports module in a new interpreter with -X importtime and returns the cumulative time in us of each module."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class MyTestCase(unittest.TestCase):
+    def test_no_heavy_import(self):
+        imported = {name.split(".")[0] for name in import_times("to_clippd.to_clippd")}
+        self.assertEqual(imported & HEAVY_MODULES, set(), "Those modules should only be imported when used")
+
+    def test_import_time_budget(self):
+        # Best of 3 to be less sensitive to the load of the machine.
+        best = min(import_times("to_clippd.to_clippd")["to_clippd.to_clippd"] for _ in range(3)) / 1e6
+        self.assertLess(best, IMPORT_TIME_BUDGET_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+import pandas as pd
+
+import to_clippd.derive_insights.stroke_gained as stroke_gained
+from to_clippd.to_clippd import _read_files
+from to_clippd.to_clippd import ToClippd
+
+PATH_ROUNDS_JSON = "to_clippd/test/unit/test_aggregate_data/round.json"
+PATH_TERRAIN_JSON = "to_clippd/test/unit/test_aggregate_data/terrain.json"
+PATH_COURSE_JSON = "to_clippd/test/unit/test_aggregate_data/2020-12-03T12_20_14.080Z.json"
+NOT_EXIST_ROUNDS = "to_clippd/test/unit/test_read_file/DOES_NOT_EXIST.json"
+INVALID_TERRAIN_JSON = "to_clippd/test/unit/test_read_file/test_terrain.json"
+
+
+class MyTestCase(unittest.TestCase):
+    def test_process_batch_equals_process(self):
+        cl = ToClippd()
+        files = (PATH_ROUNDS_JSON, PATH_TERRAIN_JSON, PATH_COURSE_JSON)
+        expected = cl.process("arccos", *files)
+        bad_files = (NOT_EXIST_ROUNDS, PATH_TERRAIN_JSON, PATH_COURSE_JSON)
+        with patch("sys.stdout", new=StringIO()):
+            output = list(cl.process_batch("arccos", [files, bad_files, files], queue_size=1))
+        self.assertEqual(len(output), 3)
+        pd.testing.assert_frame_equal(output[0], expected)
+        self.assertIsNone(output[1], "A chunk with missing files should give None")
+        pd.testing.assert_frame_equal(output[2], expected)
+        report = cl.pipeline.report
+        self.assertEqual([stage["stage"] for stage in report], ["read", "aggregate", "derive", "map"])
+        self.assertEqual([stage["kind"] for stage in report], ["thread", "process", "process", "thread"])
+        self.assertTrue(all(stage["items"] == 3 for stage in report))
+
+    def test_process_out_of_core_equals_process(self):
+        cl = ToClippd()
+        files = (PATH_ROUNDS_JSON, PATH_TERRAIN_JSON, PATH_COURSE_JSON)
+        bad_files = (NOT_EXIST_ROUNDS, PATH_TERRAIN_JSON, PATH_COURSE_JSON)
+        invalid_files = (PATH_ROUNDS_JSON, INVALID_TERRAIN_JSON, PATH_COURSE_JSON)
+        data = cl.derive_insights.process(cl.aggregate_data.process(*_read_files("arccos", files)))
+        expected = cl.map_to_clippd.process("arccos", pd.concat([data, data])).reset_index(drop=True)
+        with patch("sys.stdout", new=StringIO()):
+            # A small memory limit makes each chunk a run on disk.
+            parts = list(cl.process_out_of_core("arccos", [files, bad_files, invalid_files, files],
+                                                memory_limit=10 ** 5))
+        self.assertGreater(len(parts), 1)
+        pd.testing.assert_frame_equal(pd.concat(parts), expected)
+        self.assertEqual([error["file"] for error in cl.read_errors], [NOT_EXIST_ROUNDS, INVALID_TERRAIN_JSON])
+
+    def test_fast_start_builds_the_tools_when_first_used(self):
+        with patch.object(stroke_gained, "read_benchmark", wraps=stroke_gained.read_benchmark) as read_benchmark:
+            cl = ToClippd(fast_start=True)
+            self.assertEqual([cl._aggregate_data, cl._derive_insights, cl._map_to_clippd], [None, None, None])
+            read_benchmark.assert_not_called()
+            result = cl.process("arccos", PATH_ROUNDS_JSON, PATH_TERRAIN_JSON, PATH_COURSE_JSON)
+            read_benchmark.assert_called_once()
+        pd.testing.assert_frame_equal(result, ToClippd().process("arccos", PATH_ROUNDS_JSON, PATH_TERRAIN_JSON,
+                                                                 PATH_COURSE_JSON))
+        derive_insights = cl.derive_insights
+        self.assertIs(cl.derive_insights, derive_insights)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,58 @@
-from aggregate_data.aggregate_data import AggregateData
-from derive_insights.derive_insights import DeriveInsights
-from map_to_clippd.map_to_clippd import MapToClippd
-from read_file.read_file import ReadFile
+from functools import partial
+from itertools import islice
+
+from to_clippd.aggregate_data.aggregate_data import AggregateData
+from to_clippd.derive_insights.derive_insights import DeriveInsights
+from to_clippd.map_to_clippd.external_sort import MEMORY_LIMIT
+from to_clippd.map_to_clippd.map_to_clippd import MapToClippd
+from to_clippd.pipeline.pipeline import Pipeline
+from to_clippd.read_file.read_file import ReadFile
+from to_clippd.summarize_rounds.summarize_rounds import SummarizeRounds
+
+
+def _read_files(source, files, errors=None):
+    """Reads one (rounds_file, terrain_file, course_file) chunk, returns None for each file that can't be read."""
+    read_file = ReadFile(source, *files, validate=True)
+    read_file.load_data()
+    if errors is not None:
+        errors.extend(read_file.errors)
+    return read_file.rounds_data, read_file.terrain_data, read_file.course_info
+
+
+def _read_chunk(source, errors, chunk):
+    """
+    Reads a list of (rounds_file, terrain_file, course_file) as one chunk, skipping the ones that can't be read.
+
+    Returns:
+        (tuple) rounds_data, terrain_data and course_info of all the files, None if none of them can be read
+    """
+    if len(chunk) == 1:
+        return _read_files(source, chunk[0], errors)
+    rounds_data, terrain_data, courses = [], [], []
+    for files in chunk:
+        data = _read_files(source, files, errors)
+        if None not in data:
+            rounds_data.extend(data[0])
+            terrain_data.extend(data[1])
+            courses.extend(data[2]["courses"])
+    if not rounds_data:
+        return None, None, None
+    return rounds_data, terrain_data, {"courses": courses}
+
+
+def _chunks(files, chunk_size):
+    """Groups the files into lists of chunk_size."""
+    files = iter(files)
+    while True:
+        chunk = list(islice(files, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _aggregate(aggregate_data, data):
+    """Aggregates the data of one chunk."""
+    return aggregate_data.process(*data)
 
 
 class ToClippd(object):
@@ -12,11 +63,48 @@ class ToClippd(object):
         aggregate_data: An instance of AggregateData
         derive_insights: An instance of DeriveInsights
         map_to_clippd: An instance of MapToCLippd
+        summarize_rounds: An instance of SummarizeRounds, created when first used
+        fast_start: If True, each tool is only created (and its benchmarks or dictionaries loaded) when first used
+        jobs: Number of processes DeriveInsights splits the players between
+        geodesic_cache: Optional GeodesicCache used by DeriveInsights
+        pipeline: The Pipeline of the last call to process_batch, with its report
+        read_errors: Errors of the files and documents read by the last call to process, process_batch or
+                     process_out_of_core (see ReadFile.errors)
     """
-    def __init__(self):
-        self.aggregate_data = AggregateData()
-        self.derive_insights = DeriveInsights()
-        self.map_to_clippd = MapToClippd()
+    def __init__(self, fast_start=False, jobs=1, geodesic_cache=None):
+        self.fast_start = fast_start
+        self.jobs = jobs
+        self.geodesic_cache = geodesic_cache
+        self._aggregate_data = None if fast_start else AggregateData()
+        self._derive_insights = None if fast_start else DeriveInsights(jobs=jobs, geodesic_cache=geodesic_cache)
+        self._map_to_clippd = None if fast_start else MapToClippd()
+        self._summarize_rounds = None
+        self.pipeline = None
+        self.read_errors = []
+
+    @property
+    def aggregate_data(self):
+        if self._aggregate_data is None:
+            self._aggregate_data = AggregateData()
+        return self._aggregate_data
+
+    @property
+    def derive_insights(self):
+        if self._derive_insights is None:
+            self._derive_insights = DeriveInsights(jobs=self.jobs, geodesic_cache=self.geodesic_cache)
+        return self._derive_insights
+
+    @property
+    def map_to_clippd(self):
+        if self._map_to_clippd is None:
+            self._map_to_clippd = MapToClippd()
+        return self._map_to_clippd
+
+    @property
+    def summarize_rounds(self):
+        if self._summarize_rounds is None:
+            self._summarize_rounds = SummarizeRounds()
+        return self._summarize_rounds
 
     def process(self, source, rounds_file, terrain_file, course_file):
         """
@@ -30,13 +118,16 @@ class ToClippd(object):
         Returns:
             None if there is any problem with any of the files
             None if the source is not arccos
+            None if no round is valid
             (dataframe) Clippd Dataframe with all the data loaded
         """
         # A new ReadFile object is created at each call to process. Why?
         # Because if not and 2 consecutive calls are made, and the second can't load correctly certain files,
         # it will use the files from the first call. To avoid that, a new object is created each time.
-        read_file = ReadFile(source, rounds_file, terrain_file, course_file)
+        read_file = ReadFile(source, rounds_file, terrain_file, course_file, validate=True)
         read_file.load_data()
+        # Invalid rounds have been removed, the others are still processed.
+        self.read_errors = read_file.errors
 
         data = self.aggregate_data.process(read_file.rounds_data,
                                            read_file.terrain_data,
@@ -44,7 +135,68 @@ class ToClippd(object):
         data = self.derive_insights.process(data)
         return self.map_to_clippd.process(source, data)
 
+    def process_batch(self, source, files, queue_size=2, process_stages=("aggregate", "derive"), shared_memory=True,
+                      summarize=False, chunk_size=1):
+        """
+        Turns many chunks of files into Clippd Dataframes, with the stages running concurrently.
+
+        Reading, aggregating, deriving and mapping each run in their own worker, connected by bounded queues: while
+        a chunk is derived, the next ones are already read and aggregated. The report of the run (utilization and
+        queue depth of each stage) is in self.pipeline.report once all the chunks have been consumed. The errors of
+        the files are added to self.read_errors while the read stage runs in a thread.
+
+        Args:
+            source: Name of the external source
+            files: Iterable of (rounds_file, terrain_file, course_file)
+            queue_size: Maximum number of chunks waiting between two stages
+            process_stages: Stages run in their own process, the others run in threads of this process
+            shared_memory: If True, the dataframes are sent between processes through shared memory
+            summarize: If True, a last stage summarizes each Clippd Dataframe with SummarizeRounds.process
+            chunk_size: Number of (rounds_file, terrain_file, course_file) processed together as one chunk
+        Returns:
+            (generator) For each chunk in order, None if there is any problem with its files, else its Clippd
+            Dataframe (or the dict of its summaries with summarize)
+        """
+        # DeriveInsights can't start its own processes from a pipeline process, and its geodesic cache must stay in
+        # this process to be kept from one chunk to the next.
+        if self.jobs > 1 or self.geodesic_cache is not None:
+            process_stages = [name for name in process_stages if name != "derive"]
+        self.read_errors = []
+        stages = [("read", partial(_read_chunk, source, self.read_errors)),
+                  ("aggregate", partial(_aggregate, self.aggregate_data)),
+                  ("derive", self.derive_insights.process),
+                  ("map", partial(self.map_to_clippd.process, source))]
+        if summarize:
+            stages.append(("summarize", self.summarize_rounds.process))
+        self.pipeline = Pipeline([(name, function, "process" if name in process_stages else "thread")
+                                  for name, function in stages],
+                                 queue_size, shared_memory)
+        return self.pipeline.run(_chunks(files, chunk_size))
+
+    def process_out_of_core(self, source, files, memory_limit=MEMORY_LIMIT, directory=None):
+        """
+        Turns many chunks of files into one Clippd Dataframe too large for the memory, in sorted parts.
+
+        The chunks are read, aggregated and derived one at a time, and MapToClippd.process_chunks sorts them on
+        disk, so only about memory_limit bytes of mapped rows and one chunk are in memory at once.
+
+        Args:
+            source: Name of the external source
+            files: Iterable of (rounds_file, terrain_file, course_file), one per chunk
+            memory_limit: Bytes of mapped rows kept in memory
+            directory: Directory of the sorted runs, a temporary directory by default
+        Returns:
+            (generator) Sorted parts of the Clippd Dataframe of all the chunks, chunks with a problem are skipped
+            and their errors added to self.read_errors
+        """
+        self.read_errors = []
+        chunks = (self.derive_insights.process(_aggregate(self.aggregate_data,
+                                                          _read_files(source, chunk, self.read_errors)))
+                  for chunk in files)
+        return self.map_to_clippd.process_chunks(source, chunks, memory_limit, directory)
+
 
 if __name__ == "__main__":
     cl = ToClippd()
-    print(cl.process("arccos", "round.json", "terrain.json", "2020-12-03T12_20_14.080Z.json"))
+    print(cl.process("arccos", "to_clippd/round.json", "to_clippd/terrain.json",
+                     "to_clippd/2020-12-03T12_20_14.080Z.json"))